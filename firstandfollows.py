@@ -32,200 +32,337 @@ class NonTerminal:  # Representa a un simbolo no terminal
 
 LAMBDA = 'λ'
 
-t_list = OrderedDict()
+EMPTY_SYMBOLS = (LAMBDA, 'ε')  # Símbolos que denotan un cuerpo vacío
 
-nt_list = OrderedDict()
+EOF = '$'
 
-production_list = []  # Lista de producciones
+TERMINAL = 0
+NONTERMINAL = 1
 
 # ------------------------------------------------------------------
 
-def compute_all_primeros():
-    global production_list, nt_list, t_list
-
-    changed = True
-    while changed:
-        changed = False
-        for prod in production_list:
-            head, body = prod.split('→')
-            head = head.strip()
-            body_syms = body.strip().split()
-
-            if body == '':
-                body_syms = [LAMBDA]
-
-            all_nullable = True
-            for sym in body_syms:
-                # Terminal o símbolo especial
-                if sym in t_list or sym == '$':
-                    if sym not in nt_list[head].primero:
-                        nt_list[head].primero.add(sym)
-                        changed = True
-                    all_nullable = False
-                    break
-                elif sym == LAMBDA:
-                    if LAMBDA not in nt_list[head].primero:
-                        nt_list[head].primero.add(LAMBDA)
-                        changed = True
-                    all_nullable = False
-                    break
-                else:
-                    # NonTerminal
-                    if sym not in nt_list:
-                        continue
-                        
-                    before = len(nt_list[head].primero)
-                    nt_list[head].primero |= (nt_list[sym].primero - {LAMBDA})
-                    if len(nt_list[head].primero) > before:
-                        changed = True
-
-                    if LAMBDA in nt_list[sym].primero:
-                        continue
-                    else:
-                        all_nullable = False
-                        break
-
-            if all_nullable:
-                if LAMBDA not in nt_list[head].primero:
-                    nt_list[head].primero.add(LAMBDA)
-                    changed = True
-
-def compute_primero(symbol=None):
-    # Wrapper triggering global calculation
-    compute_all_primeros()
-
-    # Si se llamó con un símbolo específico (modo wrapper)
-    if symbol:
-        if symbol in t_list or symbol == '$':
-            return {symbol}
-        elif symbol in nt_list:
-            return nt_list[symbol].primero
-        else:
-            return set()
-
-
-def compute_all_siguientes():
-    global production_list, nt_list, t_list
-    
-    # Initialize Start Symbol Follow if empty (or always ensure it has $)
-    if not nt_list:
-        return
-
-    start_symbol = list(nt_list.keys())[0]
-    nt_list[start_symbol].add_siguiente({'$'})
-
-    changed = True
-    while changed:
-        changed = False
-        
-        for prod in production_list:
-            head, body = prod.split('→')
-            head = head.strip()
-            body_tokens = body.strip().split()
-
-            for i, B in enumerate(body_tokens):
-                if B not in nt_list:
-                    continue
-
-                # Case A → α B β
-                # Follow(B) += First(β) - {λ}
-                
-                # Calculate First(β)
-                beta = body_tokens[i + 1:]
-                first_beta = compute_first_sequence(beta)
-                
-                before_len = len(nt_list[B].siguiente)
-                
-                nt_list[B].add_siguiente(first_beta - {LAMBDA})
-                
-                # If β is nullable (λ in First(β)) or β is empty (end of production)
-                # Follow(B) += Follow(head)
-                if not beta or LAMBDA in first_beta:
-                    current_head_follow = nt_list[head].siguiente
-                    if not nt_list[B].siguiente.issuperset(current_head_follow):
-                         nt_list[B].add_siguiente(current_head_follow)
-                    
-                if len(nt_list[B].siguiente) > before_len:
-                    changed = True
-
-def compute_siguiente(symbol):
-    compute_all_siguientes()
-    if symbol in nt_list:
-        return nt_list[symbol].siguiente
-    return set()
+class BuildContext:
+    """
+    State of a single parser build: declared symbols (`t_list`, `nt_list`),
+    the production list and its compiled `grammar`.
+
+    Every generator and driver receives the context explicitly instead of
+    reading module globals, so several grammars can be built concurrently
+    (thread or process pool) and kept alive in the same process.
+    """
+
+    def __init__(self, productions=(), terminals=(), nonterminals=()):
+        self.t_list = OrderedDict((t, Terminal(t)) for t in terminals)
+        self.nt_list = OrderedDict((nt, NonTerminal(nt)) for nt in nonterminals)
+        self.production_list = list(productions)  # Lista de producciones
+        self.grammar = None  # Gramática compilada (ver compile_grammar)
 
 # ------------------------------------------------------------------
 
-def get_primero(symbol):  # wrapper method
-    return compute_primero(symbol)
+class Grammar:
+    """
+    Compiled form of a production list, built once per grammar.
+
+    Symbols are interned to small ints: terminals first (declared order,
+    then undeclared body symbols, then '$'), followed by non-terminals
+    (declared order, then undeclared heads). Each production is stored as
+    (head_id, tuple(body_ids)); λ/ε bodies become the empty tuple.
+
+    LR(0) items are ints as well: the item with the dot before position
+    `dot` of production `p` is `item_base[p] + dot`.
+    """
+
+    def __init__(self, productions, terminals=(), nonterminals=()):
+        self.production_list = list(productions)
+
+        split = []
+        for prod in self.production_list:
+            head, body = prod.split('→', 1)
+            body_syms = [sym for sym in body.split() if sym not in EMPTY_SYMBOLS]
+            split.append((head.strip(), body_syms))
+
+        heads = [head for head, _ in split]
+        nt_names = list(OrderedDict.fromkeys(list(nonterminals) + heads))
+        nt_set = set(nt_names)
+
+        t_names = [t for t in terminals if t not in nt_set and t not in EMPTY_SYMBOLS and t != EOF]
+        for _, body_syms in split:
+            t_names += [sym for sym in body_syms if sym not in nt_set and sym != EOF]
+        t_names = list(OrderedDict.fromkeys(t_names)) + [EOF]
+
+        self.symbols = t_names + nt_names  # id -> nombre
+        self.ids = {name: i for i, name in enumerate(self.symbols)}  # nombre -> id
+        self.kinds = [TERMINAL] * len(t_names) + [NONTERMINAL] * len(nt_names)
+        self.terminals = list(range(len(t_names)))
+        self.nonterminals = list(range(len(t_names), len(self.symbols)))
+        self.eof = self.ids[EOF]
+
+        self.productions = []  # [(head_id, body_ids)]
+        self.prods_by_head = [[] for _ in self.symbols]  # head_id -> [prod_idx]
+        self.prod_index = {}  # (head_id, body_ids) -> prod_idx
+        for i, (head, body_syms) in enumerate(split):
+            prod = (self.ids[head], tuple(self.ids[sym] for sym in body_syms))
+            self.productions.append(prod)
+            self.prods_by_head[prod[0]].append(i)
+            self.prod_index.setdefault(prod, i)
+
+        self.start = self.productions[0][0] if self.productions else None
+
+        # Ítems LR(0): item -> producción, posición del punto y símbolo tras el punto (-1 al final)
+        self.item_base = []
+        self.item_prod = []
+        self.item_dot = []
+        self.item_next = []
+        for i, (head, body) in enumerate(self.productions):
+            self.item_base.append(len(self.item_prod))
+            for dot in range(len(body) + 1):
+                self.item_prod.append(i)
+                self.item_dot.append(dot)
+                self.item_next.append(body[dot] if dot < len(body) else -1)
+
+        # Ítems LR(0) que aporta cerrar sobre cada no terminal
+        # (ver generator_lr.predictions)
+        self.lr0_predict = None
+
+        # Conjuntos como máscaras de bits sobre ids de terminales
+        # (ver compute_first_follow_bits)
+        self.first = None
+        self.nullable = None
+        self.follow = None
+
+        # FIRST(β) / anulable(β) de cada sufijo: [prod_idx][dot]
+        self.suffix_first = None
+        self.suffix_nullable = None
+
+    def is_terminal(self, sym_id):
+        return self.kinds[sym_id] == TERMINAL
+
+    def body_names(self, prod_idx):
+        return [self.symbols[sym] for sym in self.productions[prod_idx][1]]
+
+    def head_name(self, prod_idx):
+        return self.symbols[self.productions[prod_idx][0]]
+
+    def production_str(self, prod_idx):
+        return self.production_list[prod_idx]
+
+    def item_str(self, item):
+        """ Text of an LR(0) item, e.g. 'E→E . + T'. """
+        p, dot = self.item_prod[item], self.item_dot[item]
+        body = self.body_names(p)
+        return self.head_name(p) + '→' + ' '.join(body[:dot] + ['.'] + body[dot:])
+
+    def terminal_names(self, bits):
+        digits = bin(bits)[:1:-1]  # Bit menos significativo primero
+        return [self.symbols[i] for i, bit in enumerate(digits) if bit == '1']
+
+
+def compile_grammar(ctx):
+    """
+    Compiles the context's production list into `ctx.grammar` and makes sure
+    every non-terminal it uses has an entry in `ctx.nt_list`.
+    """
+    g = Grammar(ctx.production_list, ctx.t_list.keys(), ctx.nt_list.keys())
+    for nt in g.nonterminals:
+        name = g.symbols[nt]
+        if name not in ctx.nt_list:
+            ctx.nt_list[name] = NonTerminal(name)
+    ctx.grammar = g
+    return g
+
+# ------------------------------------------------------------------
+
+def get_grammar(ctx):
+    return ctx.grammar if ctx.grammar is not None else compile_grammar(ctx)
 
-def get_siguiente(symbol):
-    global nt_list, t_list
-    if symbol in t_list.keys():
-        return None
-    return nt_list[symbol].siguiente
 
 # ------------------------------------------------------------------
 
-def compute_first_sequence(symbols):
-    result = set()
-    for sym in symbols:
-        # We assume firsts are already computed globally if we are inside compute_all_siguientes
-        if sym in t_list or sym == '$':
-            first = {sym}
-        elif sym in nt_list:
-            first = nt_list[sym].primero
-        else:
-            first = set() # Unknown symbol
-            
-        result.update(first - {LAMBDA})
-        if LAMBDA not in first:
-            break
-    else:
-        result.add(LAMBDA)
+def digraph(nodes, edges, base):
+    """
+    DeRemer–Pennello Digraph algorithm.
+
+    Computes F(x) = base[x] | F(y) for every y in edges[x], where F values
+    are bitmasks. Strongly connected components are found with Tarjan's
+    algorithm and share a single value, so every set is unioned once along
+    the condensed DAG. Iterative, so deep grammars do not hit the
+    recursion limit. Returns a new list indexed like `base`.
+    """
+    result = list(base)
+    depth = [0] * len(result)
+    done = len(result) + 1  # Mayor que cualquier profundidad de la pila
+    stack = []
+
+    for root in nodes:
+        if depth[root]:
+            continue
+        stack.append(root)
+        depth[root] = len(stack)
+        calls = [(root, len(stack), iter(edges[root]))]
+
+        while calls:
+            x, d, pending = calls[-1]
+            for y in pending:
+                if not depth[y]:
+                    stack.append(y)
+                    depth[y] = len(stack)
+                    calls.append((y, len(stack), iter(edges[y])))
+                    break
+                depth[x] = min(depth[x], depth[y])
+                result[x] |= result[y]
+            else:
+                calls.pop()
+                if depth[x] == d:
+                    # x es raíz de su componente: todos comparten F(x)
+                    while True:
+                        top = stack.pop()
+                        depth[top] = done
+                        result[top] = result[x]
+                        if top == x:
+                            break
+                if calls:
+                    parent = calls[-1][0]
+                    depth[parent] = min(depth[parent], depth[x])
+                    result[parent] |= result[x]
+
     return result
 
 
+def compute_first_follow_bits(ctx):
+    """
+    Bitset engine for FIRST/FOLLOW.
+
+    Sets are int bitmasks over terminal ids and are propagated with a
+    worklist over reverse dependencies, so a production is only looked at
+    again when one of its inputs changed. Results are stored in
+    `grammar.first`, `grammar.nullable` and `grammar.follow` (indexed by
+    symbol id), together with the FIRST/nullable table of every production
+    suffix (`grammar.suffix_first[prod][dot]`), and published to the usual
+    `ctx.nt_list[...].primero/siguiente` sets, with λ marking nullable
+    non-terminals. FOLLOW is solved as a
+    relation closure over "FOLLOW(B) ⊇ FOLLOW(A)" with digraph().
+    """
+    g = get_grammar(ctx)
+    n = len(g.symbols)
+
+    first = [0] * n
+    nullable = [False] * n
+    for t in g.terminals:
+        first[t] = 1 << t
+
+    # 1. Anulables: cada producción cuenta sus símbolos aún no anulables
+    pending = [len(body) for _, body in g.productions]
+    uses = [[] for _ in range(n)]  # símbolo -> producciones donde aparece
+    worklist = []
+    for i, (head, body) in enumerate(g.productions):
+        for sym in body:
+            uses[sym].append(i)
+        if not body and not nullable[head]:
+            nullable[head] = True
+            worklist.append(head)
+
+    while worklist:
+        sym = worklist.pop()
+        for i in uses[sym]:
+            pending[i] -= 1
+            head = g.productions[i][0]
+            if pending[i] == 0 and not nullable[head]:
+                nullable[head] = True
+                worklist.append(head)
+
+    # 2. Primero: FIRST(A) ⊇ FIRST(X) para cada X de un prefijo anulable de A → α
+    dependents = [set() for _ in range(n)]
+    for head, body in g.productions:
+        for sym in body:
+            if g.kinds[sym] == TERMINAL:
+                first[head] |= first[sym]
+                break
+            if sym != head:
+                dependents[sym].add(head)
+            if not nullable[sym]:
+                break
+
+    worklist = [nt for nt in g.nonterminals if first[nt]]
+    while worklist:
+        sym = worklist.pop()
+        for head in dependents[sym]:
+            merged = first[head] | first[sym]
+            if merged != first[head]:
+                first[head] = merged
+                worklist.append(head)
+
+    g.first, g.nullable = first, nullable
+
+    # Tabla de sufijos: FIRST/anulable de β para cada (producción, punto)
+    suffix_first, suffix_nullable = [], []
+    for _, body in g.productions:
+        firsts = [0] * (len(body) + 1)
+        nullables = [True] * (len(body) + 1)
+        for i in range(len(body) - 1, -1, -1):
+            sym = body[i]
+            if nullable[sym]:
+                firsts[i] = first[sym] | firsts[i + 1]
+                nullables[i] = nullables[i + 1]
+            else:
+                firsts[i] = first[sym]
+                nullables[i] = False
+        suffix_first.append(firsts)
+        suffix_nullable.append(nullables)
+
+    g.suffix_first, g.suffix_nullable = suffix_first, suffix_nullable
+
+    # 3. Siguiente: FOLLOW(B) ⊇ FIRST(β) y, si β es anulable, FOLLOW(B) ⊇ FOLLOW(A).
+    # La relación "incluye" se arma una sola vez y se cierra con digraph()
+    follow = [0] * n
+    if g.start is not None:
+        follow[g.start] = 1 << g.eof
+
+    includes = [[] for _ in range(n)]
+    for p, (head, body) in enumerate(g.productions):
+        for i, sym in enumerate(body):
+            if g.kinds[sym] == NONTERMINAL:
+                follow[sym] |= suffix_first[p][i + 1]
+                if suffix_nullable[p][i + 1] and sym != head:
+                    includes[sym].append(head)
+
+    follow = digraph(g.nonterminals, includes, follow)
+
+    g.follow = follow
+
+    # Los no terminales de una misma componente comparten máscara
+    names = {}
+    for nt in g.nonterminals:
+        entry = ctx.nt_list[g.symbols[nt]]
+        for bits, add in ((first[nt], entry.add_primero), (follow[nt], entry.add_siguiente)):
+            if bits not in names:
+                names[bits] = frozenset(g.terminal_names(bits))
+            add(names[bits])
+        if nullable[nt]:
+            entry.add_primero({LAMBDA})
+
 # ------------------------------------------------------------------
-def main(pl=None):
-    global production_list, nt_list, t_list
 
+def get_siguiente(ctx, symbol):
+    if symbol in ctx.t_list.keys():
+        return None
+    return ctx.nt_list[symbol].siguiente
+
+# ------------------------------------------------------------------
+def main(pl=None):
     if pl:
-        production_list[:] = pl
-
-        for prod in production_list:
-            head, body = prod.split('→')
-            head = head.strip()
-            body_tokens = body.strip().split()
-
-            # Asegura que el símbolo de la cabeza es un no terminal
-            if head not in nt_list:
-                nt_list[head] = NonTerminal(head)
-
-            for sym in body_tokens:
-                if sym == LAMBDA:
-                    continue
-
-                if sym not in nt_list and sym not in t_list:
-                    # Si el símbolo aparece por primera vez
-                    # Lo consideramos terminal si no ha sido cabeza de producción
-                    is_non_terminal = any(sym == p.split('→')[0].strip() for p in production_list)
-                    if is_non_terminal:
-                        if sym not in nt_list:
-                             nt_list[sym] = NonTerminal(sym)
-                    else:
-                        t_list[sym] = Terminal(sym)
-                # Si el símbolo ya existe pero hay conflicto de instanciacion
-                elif sym in t_list and t_list[sym] is None:
-                    t_list[sym] = Terminal(sym)
-                elif sym in nt_list and nt_list[sym] is None:
-                    nt_list[sym] = NonTerminal(sym)
-                    
+        ctx = BuildContext(pl)
+
+        # Las cabezas de producción son no terminales; el resto, terminales
+        g = compile_grammar(ctx)
+        for t in g.terminals:
+            name = g.symbols[t]
+            if name != EOF and name not in ctx.t_list:
+                ctx.t_list[name] = Terminal(name)
+
         # RUN LOGIC
-        compute_all_primeros()
-        compute_all_siguientes()
+        compute_first_follow_bits(ctx)
 
-        return pl
+        return ctx
     else:
         print("Debe pasarse una lista de producciones como argumento.")
 
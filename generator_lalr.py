@@ -1,185 +1,219 @@
-
 import generator_clr
+import generator_lr
 import firstandfollows
 from collections import OrderedDict, defaultdict
+from generator_lr import ClosureCache
 
 class LALRState:
-    def __init__(self, states_to_merge):
-        # states_to_merge: list of generator_clr.State
-        
-        # 1. Calculate combined ID
-        # Sort by ID ensures deterministic name "36", not "63"
-        self.sorted_states = sorted(states_to_merge, key=lambda s: s.no)
-        self.original_ids = [s.no for s in self.sorted_states]
-        
-        # Name: concatenation of IDs
-        self.no = "".join(str(s.no) for s in self.sorted_states)
-        
-        # 2. Merge lookaheads
-        self.closure = []
-        
-        # Group items by their core string
-        core_map = defaultdict(set)
-        
-        for state in self.sorted_states:
-            items = state.closure if hasattr(state, 'closure') else state
-            for item in items:
-                # Extract core text "A->alpha.beta"
-                # generator_clr.Item.__new__ stores the string.
-                # item is the string.
-                # However, iterating 'item' yields characters.
-                # We can't trust str(item) because it appends lookaheads.
-                # But we know `item` is a str subclass.
-                # Item slicing `item[:]` works to extract characters.
-                core_text = "".join(list(item))
-                
-                for la in item.lookahead:
-                    core_map[core_text].add(la)
-                    
-        # Create new Items with merged lookaheads
-        for core, lookaheads in core_map.items():
-            new_item = generator_clr.Item(core, list(lookaheads))
-            self.closure.append(new_item)
-
-def calc_states_lalr():
-    # 1. Get CLR states (which are processed by generator_clr.calc_states)
-    # Note: generator_clr.calc_states might already return State objects or lists
-    clr_raw = generator_clr.calc_states()
+    def __init__(self, no, kernel, cache, original_ids=()):
+        # Número denso (posición en la lista de estados)
+        self.no = no
+        # Estados CLR fusionados en éste (vacío si se construyó desde LR(0));
+        # sólo para mostrar, las tablas y el parser usan `no`
+        self.original_ids = list(original_ids)
+
+        # Kernel items (generator_clr.Item) with their LALR lookaheads; the
+        # closure is derived from them on demand
+        self.kernel = kernel
+        self.cache = cache
+
+        # id de símbolo -> número del estado LALR destino (se completa en calc_states_lalr)
+        self.transitions = OrderedDict()
+
+    @property
+    def closure(self):
+        """ Full item list, expanded from the kernel on demand. """
+        return self.cache.get(self)
+
+
+def merge_states(no, states_to_merge, cache):
+    # states_to_merge: list of generator_clr.State sharing one LR(0) core
+
+    # 1. Original CLR ids, sorted so the merge map is deterministic
+    sorted_states = sorted(states_to_merge, key=lambda s: s.no)
     
-    # Standardize to State objects
-    generator_clr.State._id = 0
-    clr_states = []
-    for s in clr_raw:
-        if not isinstance(s, generator_clr.State):
-            clr_states.append(generator_clr.State(s))
-        else:
-            # Re-id for consistency if already States
-            s.no = generator_clr.State._id
-            generator_clr.State._id += 1
-            clr_states.append(s)
+    # 2. Merge kernel lookaheads (the LR(1) closure distributes over
+    # the union, so the merged closure is derived from this kernel)
+    # Group items by their LR(0) core, OR-ing the lookahead bitmasks
+    core_map = OrderedDict()
+    
+    for state in sorted_states:
+        for item in state.kernel:
+            core_map[item.core] = core_map.get(item.core, 0) | item.lookahead
+
+    return LALRState(no,
+                     [generator_clr.Item(core, lookaheads) for core, lookaheads in core_map.items()],
+                     cache, [s.no for s in sorted_states])
+
+
+def calc_states_lalr(ctx):
+    """
+    LALR(1) states built from the LR(0) automaton. Lookaheads come from the
+    DeRemer–Pennello relations over nonterminal transitions (p, A):
+
+        Read(p, A)   = DR(p, A) ∪ Read(r, C)    for (p, A) reads (r, C)
+        Follow(p, A) = Read(p, A) ∪ Follow(p', B) for (p, A) includes (p', B)
+
+    and each kernel item takes the Follow sets of its lookback transitions.
+    The canonical LR(1) collection is never built (see calc_states_lalr_clr).
+    """
+    g = firstandfollows.get_grammar(ctx)
+    lr0 = generator_lr.calc_states(ctx)
+
+    # 1. Nodos: transiciones sobre no terminales. El nodo 0 es la transición
+    # ficticia (0, Z) del símbolo inicial aumentado, cuyo Follow es {$}
+    nodes = [(0, g.start)]
+    node_of = {(0, g.start): 0}
+    for s in lr0:
+        for sym in s.transitions:
+            if not g.is_terminal(sym):
+                node_of[(s.no, sym)] = len(nodes)
+                nodes.append((s.no, sym))
+
+    # 2. DR (terminales que se desplazan tras A) y la relación "reads"
+    # (no terminales anulables que siguen a A)
+    direct = [0] * len(nodes)
+    direct[0] = 1 << g.eof
+    reads = [[] for _ in nodes]
+    for x in range(1, len(nodes)):
+        p, A = nodes[x]
+        r = lr0[lr0[p].transitions[A]]
+        for sym in r.transitions:
+            if g.is_terminal(sym):
+                direct[x] |= 1 << sym
+            elif g.nullable[sym]:
+                reads[x].append(node_of[(r.no, sym)])
+    read = firstandfollows.digraph(range(len(nodes)), reads, direct)
+
+    # 3. "includes" y "lookback": se recorre cada producción de A desde p.
+    # Cada ítem A→β.γ alcanzado (en el estado q tras leer β) recibe Follow(p, A)
+    includes = [[] for _ in nodes]
+    lookback = defaultdict(list)  # (estado, ítem núcleo) -> [nodo]
+    for x, (p, A) in enumerate(nodes):
+        for prod_idx in g.prods_by_head[A]:
+            q = p
+            for dot, B in enumerate(g.productions[prod_idx][1]):
+                if not g.is_terminal(B) and g.suffix_nullable[prod_idx][dot + 1]:
+                    includes[node_of[(q, B)]].append(x)
+                q = lr0[q].transitions[B]
+                lookback[(q, g.item_base[prod_idx] + dot + 1)].append(x)
+    follow = firstandfollows.digraph(range(len(nodes)), includes, read)
+
+    # 4. LALR states: LR(0) kernels with their lookaheads
+    cache = ClosureCache(ctx, generator_clr.closure)
+    lalr_states = []
+    for s in lr0:
+        kernel = []
+        for item in s.kernel:
+            lookaheads = 1 << g.eof if item == g.item_base[0] else 0
+            for x in lookback[(s.no, item)]:
+                lookaheads |= follow[x]
+            kernel.append(generator_clr.Item(item, lookaheads))
+        lalr_states.append(LALRState(s.no, kernel, cache))
+    for s, merged_state in zip(lr0, lalr_states):
+        merged_state.transitions.update(s.transitions)
+
+    return lalr_states
+
+
+def calc_states_lalr_clr(ctx):
+    """
+    LALR(1) states by merging the canonical LR(1) collection by core. Same
+    automaton as calc_states_lalr, at the cost of building CLR(1) first.
+    """
+    # 1. Get CLR states (numbered by position)
+    clr_states = generator_clr.calc_states(ctx)
     
     # 3. Group by Core
     states_by_core = defaultdict(list)
     
     for state in clr_states:
-        items = state.closure
-        
-        # Signature: sorted list of core strings
-        cores = []
-        for item in items:
-             # Extract core text "A->alpha.beta"
-             # Since it's a generator_clr.Item, str(item) might have lookaheads.
-             # We use the list-casting trick or slice to get core text.
-             core_text = "".join(list(item))
-             cores.append(core_text)
-        
-        signature = tuple(sorted(cores))
+        # Signature: set of LR(0) kernel item ids
+        signature = frozenset(item.core for item in state.kernel)
         states_by_core[signature].append(state)
         
-    # 4. Create LALR states
-    lalr_states = []
+    # 4. Create LALR states, numbered densely in order of their first
+    # original ID (the CLR start state 0 stays state 0)
+    groups = sorted(states_by_core.values(), key=lambda group: min(s.no for s in group))
     
-    for signature, group in states_by_core.items():
-        merged_state = LALRState(group)
-        lalr_states.append(merged_state)
+    cache = ClosureCache(ctx, generator_clr.closure)
+    lalr_states = [merge_states(no, group, cache) for no, group in enumerate(groups)]
 
-    # Sort by the first original ID for consistent ordering
-    lalr_states.sort(key=lambda s: s.original_ids[0])
+    # 5. Transitions: every CLR state of a group has the same LR(0) core,
+    # so its recorded transitions land in the same merged states
+    merged_no = {}  # id CLR -> número LALR
+    for merged_state in lalr_states:
+        for orig in merged_state.original_ids:
+            merged_no[orig] = merged_state.no
+    for merged_state in lalr_states:
+        for symbol, target in clr_states[merged_state.original_ids[0]].transitions.items():
+            merged_state.transitions[symbol] = merged_no[target]
     
     return lalr_states
 
-def make_table_lalr(states):
+def make_table_lalr(ctx, states):
     table = OrderedDict()
     
-    # Helper: find LALR state by Core
-    def getstateno_lalr(target_closure):
-        # target_closure: list of Items
-        target_cores = sorted(["".join(list(itm)) for itm in target_closure])
-        
-        for s in states:
-            s_cores = sorted(["".join(list(itm)) for itm in s.closure])
-            if target_cores == s_cores:
-                return s.no
-        return -1
+    g = firstandfollows.get_grammar(ctx)
+
+    def add_action(row, term, action):
+        # Conflict Check: a set holds a conflict; a plain string must be
+        # compared whole ('r1' is not in 'r15')
+        if term in row:
+            prev = row[term]
+            if isinstance(prev, set):
+                prev.add(action)
+            elif prev != action:
+                row[term] = {prev, action}
+        else:
+            row[term] = action
 
     # Initialize Rows
     for s in states:
         table[s.no] = OrderedDict()
         
     for s in states:
-        # CALCULATE ACTIONS
+        row = table[s.no]
+
+        # SHIFT / GOTO: straight from the transitions recorded while building
+        # the collection (one entry per edge, no goto or closure recomputed)
+        for sym, next_id in s.transitions.items():
+            if g.is_terminal(sym):
+                add_action(row, g.symbols[sym], f"s{next_id}")
+            else:
+                row[g.symbols[sym]] = str(next_id)
+
+        # REDUCE: only completed items need the closure
         for item in s.closure:
-            head, body = item.split('→')
-            symbols = generator_clr.split_body_with_dot(body.strip())
-            
-            if '.' in symbols and symbols.index('.') < len(symbols) - 1:
-                # SHIFT
-                dot_pos = symbols.index('.')
-                term = symbols[dot_pos + 1]
-                
-                if term in generator_clr.t_list:
-                    # GOTO using CLR check
-                    next_closure = generator_clr.goto(s.closure, term)
-                    next_id = getstateno_lalr(next_closure)
-                    
-                    if next_id != -1:
-                        action = f"s{next_id}"
-                        # Conflict Check
-                        if term in table[s.no]:
-                             prev = table[s.no][term]
-                             # Only add if distinct
-                             if str(action) != str(prev) and action not in prev:
-                                 if isinstance(prev, set):
-                                     prev.add(action)
-                                 else:
-                                     table[s.no][term] = {prev, action}
-                        else:
-                             table[s.no][term] = action
-
-            elif '.' in symbols and symbols.index('.') == len(symbols) - 1:
-                 # REDUCE
-                 if head == list(firstandfollows.nt_list.keys())[0]: # Start Symbol
-                     for la in item.lookahead:
-                         if la == '$':
-                             table[s.no]['$'] = "Aceptar"
-                 else:
-                     prod_no = generator_clr.getprodno(item)
-                     for la in item.lookahead:
-                         action = f"r{prod_no}"
-                         if la in table[s.no]:
-                             prev = table[s.no][la]
-                             if str(action) != str(prev) and action not in prev: 
-                                 if isinstance(prev, set):
-                                     prev.add(action)
-                                 else:
-                                     table[s.no][la] = {prev, action}
-                         else:
-                             table[s.no][la] = action
-                             
-        # CALCULATE GOTO (NTs)
-        for nt in generator_clr.nt_list:
-            next_closure = generator_clr.goto(s.closure, nt)
-            if not next_closure: continue
-            
-            next_id = getstateno_lalr(next_closure)
-            if next_id != -1:
-                table[s.no][nt] = str(next_id)
+            if g.item_next[item.core] != -1:
+                continue
+            prod_no = g.item_prod[item.core]
+            if g.productions[prod_no][0] == g.start: # Start Symbol
+                if item.lookahead >> g.eof & 1:
+                    row['$'] = "Aceptar"
+            else:
+                for la in g.terminal_names(item.lookahead):
+                    add_action(row, la, f"r{prod_no}")
 
     return table
 
-def format_states(states, codigos_equivalentes={}, show_lambda=False, empty_symbol='λ'):
-    # Reuse generator_clr formatter, but handle LALR State ID (string) if needed
-    # generator_clr.format_states uses enumerate idx for ID.
-    # LALR states have custom IDs (s.no). 
-    # We should override or wrap it.
+def state_title(state):
+    # "3" o, si viene de fusionar estados CLR, "3 (CLR 3, 6)"
+    if state.original_ids:
+        return f"{state.no} (CLR {', '.join(str(i) for i in state.original_ids)})"
+    return str(state.no)
+
+def format_states(ctx, states, codigos_equivalentes={}, show_lambda=False, empty_symbol='λ'):
+    # Like generator_clr.format_states, but titles show the merge map
     
     output = []
     for s in states:
-        output.append(f"State {s.no}:")
+        output.append(f"State {state_title(s)}:")
         
         items = s.closure
         for item in items:
-            item_str = item.replace('.', '●').replace('→', '->')
+            text, lookaheads = generator_clr.item_lines(ctx, item)
+            item_str = text.replace('.', '●').replace('→', '->')
             if codigos_equivalentes:
                 for cod, txt in codigos_equivalentes.items():
                     item_str = item_str.replace(cod, txt)
@@ -194,7 +228,6 @@ def format_states(states, codigos_equivalentes={}, show_lambda=False, empty_symb
                         else: rhs = f"{empty_symbol} ●"
                 item_str = f"{lhs}-> {rhs}"
 
-            lookaheads = item.lookahead
             for la in lookaheads:
                  la_str = codigos_equivalentes.get(la, la) if codigos_equivalentes else la
                  output.append(f"  [ {item_str}, {la_str} ]")
@@ -206,7 +239,7 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
 import textwrap
 
-def export_items_to_pdf(states, filename="states_lalr1.pdf", show_lambda=False, empty_symbol='λ', codigos_equivalentes={}):
+def export_items_to_pdf(ctx, states, filename="states_lalr1.pdf", show_lambda=False, empty_symbol='λ', codigos_equivalentes={}):
     c = canvas.Canvas(filename, pagesize=A4)
     width, height = A4
     margin = inch
@@ -215,8 +248,7 @@ def export_items_to_pdf(states, filename="states_lalr1.pdf", show_lambda=False,
     c.setFont("Times-Roman", 12)
 
     for state in states:
-        # Use state.no (e.g. "36")
-        titulo = f"Item{state.no}{{"
+        titulo = f"Item{state_title(state)}{{"
         
         if y < margin:
             c.showPage()
@@ -228,7 +260,8 @@ def export_items_to_pdf(states, filename="states_lalr1.pdf", show_lambda=False,
         
         items = state.closure
         for item in items:
-            item_str = item.replace('.', '●').replace('→', '->')
+            text, lookaheads = generator_clr.item_lines(ctx, item)
+            item_str = text.replace('.', '●').replace('→', '->')
             if codigos_equivalentes:
                 for cod, txt in codigos_equivalentes.items():
                     item_str = item_str.replace(cod, txt)
@@ -242,7 +275,7 @@ def export_items_to_pdf(states, filename="states_lalr1.pdf", show_lambda=False,
                         else: rhs = f"{empty_symbol} ●"
                 item_str = f"{lhs}-> {rhs}"
 
-            for la in item.lookahead:
+            for la in lookaheads:
                 la_str = codigos_equivalentes.get(la, la) if codigos_equivalentes else la
                 line = f"[ {item_str}, {la_str} ]"
 
@@ -1,23 +1,28 @@
 from collections import defaultdict
 import firstandfollows
+import parse_tables
+import parse_trace
+import parse_tree
 
 LAMBDA = firstandfollows.LAMBDA
 
-def compute_ll1_table():
+def compute_ll1_table(ctx):
     """
-    Computes the LL(1) parsing table using the global state in `primerosysiguientes`.
+    Computes the LL(1) parsing table for the build context `ctx`
+    (compute_first_follow_bits must have run on its grammar).
     Returns:
         dict: A dictionary representing the table {NonTerminal: {Terminal: ProductionIndex}}.
     """
     tabla = defaultdict(dict)
+    g = firstandfollows.get_grammar(ctx)
 
-    for i, prod in enumerate(firstandfollows.production_list):
-        head, body = prod.split("→")
-        head = head.strip()
-        body_syms = body.strip().split()
+    for i, (head, body) in enumerate(g.productions):
+        head = g.symbols[head]
 
-        # Calculate First(body)
-        first = firstandfollows.compute_first_sequence(body_syms)
+        # First(body), from the precomputed suffix table
+        first = set(g.terminal_names(g.suffix_first[i][0]))
+        if g.suffix_nullable[i][0]:
+            first.add(LAMBDA)
 
         # Rule 1: For each terminal 'a' in First(beta), add A->beta to M[A, a]
         for t in first - {LAMBDA}:
@@ -26,106 +31,155 @@ def compute_ll1_table():
         # Rule 2: If epsilon in First(beta), add A->beta to M[A, b] for each b in Follow(A)
         # Also, if epsilon in First(beta) and $ in Follow(A), add A->beta to M[A, $]
         if LAMBDA in first:
-            follow = firstandfollows.get_siguiente(head)
+            follow = firstandfollows.get_siguiente(ctx, head)
             for f in follow:
                 tabla[head][f] = i
 
     return dict(tabla)
 
-class TreeNode:
-    def __init__(self, label, children=None):
-        self.label = label
-        self.children = children if children else []
+# Los árboles viven en parse_tree; TreeNode es la forma anidada de antes
+TreeNode = parse_tree.TreeNode
 
-    def to_dict(self):
-        return {
-            "name": self.label,
-            "children": [c.to_dict() for c in self.children]
-        }
-
-    def __repr__(self):
-        return f"{self.label}"
-
-def parse_input(table, start_symbol, input_tokens):
+def parse_input(ctx, table, start_symbol, input_tokens):
     """
     Parses input and returns:
-    1. Parse Tree (root node) or Error String.
-    2. List of steps (dictionaries) for visualization table:
-       [{'stack': ..., 'input': ..., 'action': ...}, ...]
+    1. Parse Tree (a parse_tree.ParseTree) or Error String.
+    2. The steps for the visualization table, as a parse_trace.LLTrace whose
+       rows render on access as {'stack': ..., 'input': ..., 'action': ...}.
+    `table` is a parse_tables.LLTable, or a compute_ll1_table dict that is
+    compiled first.
     """
+    if not isinstance(table, parse_tables.LLTable):
+        table = parse_tables.compile_ll_table(ctx, table)
+    g = table.grammar
+    predict, n_t = table.predict, table.n_terminals
+
     tokens = input_tokens + ['$']
-    stack = ['$', start_symbol]
+    # Ids de terminal de la entrada (-1 si no es terminal), como en
+    # recognize: un token con el nombre de un no terminal no empareja con él
+    input_ids = [parse_tables.token_id(g, tok) for tok in tokens]
+    trace = parse_trace.LLTrace(g, tokens)
     
-    if start_symbol not in firstandfollows.nt_list:
-        return f"Error: Start symbol '{start_symbol}' not found.", []
+    if start_symbol not in ctx.nt_list:
+        return f"Error: Start symbol '{start_symbol}' not found.", trace
 
-    root = TreeNode(start_symbol)
-    stack_nodes = [None, root] # Parallel stack for tree nodes
+    # Stack as trace nodes (node 0 is '$'), with a parallel stack of tree nodes
+    node_symbol, node_parent = trace.node_symbol, trace.node_parent
+    top = trace.push(0, g.ids[start_symbol])
+    tree = parse_tree.ParseTree(g)
+    tree.root = tree.add(g.ids[start_symbol])
+    stack_nodes = [-1, tree.root]
     
     cursor = 0
-    steps = [] 
+    guard = parse_tables.LoopGuard() # expansiones sin fin (tabla con conflictos)
     
-    while len(stack) > 0:
-        top = stack[-1]
+    while top != -1:
+        top_sym = node_symbol[top]
         current_node = stack_nodes[-1]
-        current_token = tokens[cursor]
-        input_view = " ".join(tokens[cursor:])
-        stack_view = " ".join(stack[::-1]) # Reverse stack for display ($ on left)
-        
-        step_entry = {
-            "stack": stack_view,
-            "input": input_view,
-            "action": ""
-        }
+        current = input_ids[cursor]
         
-        if top == '$':
-            if current_token == '$':
-                step_entry["action"] = "Accept"
-                steps.append(step_entry)
-                return root, steps
+        if top_sym == g.eof:
+            if current == g.eof:
+                trace.record(top, parse_trace.ACCEPT, cursor)
+                return tree, trace
             else:
-                return f"Error: Unexpected input at end.", steps
+                return f"Error: Unexpected input at end.", trace
         
-        if top == current_token:
+        if top_sym == current:
             # Match
-            step_entry["action"] = f"Match {top}"
-            stack.pop()
+            trace.record(top, parse_trace.MATCH, cursor)
+            top = node_parent[top]
             stack_nodes.pop()
             cursor += 1
-        elif top in firstandfollows.t_list or top == '$':
-             return f"Error: Expected '{top}', found '{current_token}'", steps
-        elif top in firstandfollows.nt_list:
-            if current_token not in table.get(top, {}):
-                return f"Error: No rule for [{top}, {current_token}]", steps
-            
-            prod_idx = table[top][current_token]
-            prod = firstandfollows.production_list[prod_idx]
+            guard.reset()
+        elif g.is_terminal(top_sym):
+             return f"Error: Expected '{g.symbols[top_sym]}', found '{tokens[cursor]}'", trace
+        else:
+            prod_idx = predict[(top_sym - n_t) * n_t + current] if current != -1 else -1
+            if prod_idx == -1:
+                return f"Error: No rule for [{g.symbols[top_sym]}, {tokens[cursor]}]", trace
+            if guard.repeats(top_sym, len(stack_nodes)):
+                return f"Error: Endless expansion of {g.symbols[top_sym]} on '{tokens[cursor]}' (table conflict)", trace
             
-            step_entry["action"] = f"{prod}" # Simplified action: just the production
+            trace.record(top, prod_idx, cursor) # Action shown as the production
             
-            head, body = prod.split("→")
-            body_syms = body.strip().split()
+            body = g.productions[prod_idx][1]
             
-            stack.pop()
+            top = node_parent[top]
             stack_nodes.pop()
             
-            children = []
-            if body_syms == [LAMBDA]:
-                child = TreeNode(LAMBDA)
-                children.append(child)
-            else:
-                for sym in body_syms:
-                    children.append(TreeNode(sym))
+            # Children are consecutive tree nodes (a λ leaf for an empty body)
+            first = tree.add_children(current_node, body)
             
-            current_node.children = children
-            
-            if body_syms != [LAMBDA]:
-                for i in range(len(body_syms) - 1, -1, -1):
-                    stack.append(body_syms[i])
-                    stack_nodes.append(children[i])
-        else:
-             return f"Error: Unknown symbol '{top}'", steps
-             
-        steps.append(step_entry)
+            for i in range(len(body) - 1, -1, -1):
+                top = trace.push(top, body[i])
+                stack_nodes.append(first + i)
              
-    return root, steps
+    return tree, trace
+
+
+def recognize(ctx, table, start_symbol, tokens, build_tree=False):
+    """
+    LL(1) recognizer for bulk validation: runs on symbol ids against the
+    compiled table, with no step trace and no tree unless `build_tree`.
+    `tokens` is any iterable of tokens or a space-separated string (without
+    '$'); `table` as in parse_input.
+    Returns (accepted, error_position), where error_position is the index of
+    the offending token (None when accepted). With `build_tree` the first
+    element is the parse tree (parse_tree.ParseTree) instead, or None on error.
+    A conflicting table that would expand forever without matching (see
+    parse_tables.LoopGuard) gives (None, position reached) in both modes.
+    """
+    if not isinstance(table, parse_tables.LLTable):
+        table = parse_tables.compile_ll_table(ctx, table)
+    g = table.grammar
+    predict, n_t = table.predict, table.n_terminals
+    bodies = [body for _, body in g.productions]
+
+    start = g.ids.get(start_symbol, -1)
+    if start == -1 or g.is_terminal(start):
+        return (None if build_tree else False), 0
+
+    stack = [g.eof, start]
+    tree = nodes = None
+    if build_tree:
+        tree = parse_tree.ParseTree(g)
+        tree.root = tree.add(start)
+        nodes = [-1, tree.root]  # nodos del árbol paralelos a la pila
+
+    symbols = parse_tables.symbol_stream(g, tokens)
+    sym = next(symbols)
+    cursor = 0
+
+    # Una tabla con conflictos (p.ej. recursión izquierda) puede expandir sin
+    # fin sin emparejar nada: la guarda lo detecta de forma exacta
+    guard = parse_tables.LoopGuard()
+
+    while True:
+        top = stack.pop()
+
+        if top < n_t:
+            # Match (the '$' at the bottom matches only the end of input)
+            if top != sym:
+                return (None if build_tree else False), cursor
+            if top == g.eof:
+                return (tree if build_tree else True), None
+            cursor += 1
+            sym = next(symbols)
+            if build_tree:
+                nodes.pop()
+            guard.reset()
+            continue
+
+        prod_idx = predict[(top - n_t) * n_t + sym] if sym != -1 else -1
+        if prod_idx == -1:
+            return (None if build_tree else False), cursor
+        if guard.repeats(top, len(stack) + 1):
+            return None, cursor
+
+        body = bodies[prod_idx]
+        stack.extend(reversed(body))
+
+        if build_tree:
+            first = tree.add_children(nodes.pop(), body)
+            nodes.extend(range(first + len(body) - 1, first - 1, -1))
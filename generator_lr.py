@@ -1,144 +1,119 @@
 from collections import deque, OrderedDict
 import firstandfollows
+import parse_tables
+import parse_trace
+import parse_tree
 
 
-# Added for Parse Tree Simulation
-nt_list_global = []
-
-
-nt_list = []
-t_list = []
-
 LAMBDA = 'λ'
 
+# Máximo de clausuras expandidas que se conservan a la vez por colección
+CLOSURE_CACHE_SIZE = 256
 
 
-class State:
-    _id = 0
-
-    def __init__(self, closure):
-        self.closure = closure
-        self.no = State._id
-        State._id += 1
-
-
-class Item(str):
-    def __new__(cls, item, lookahead=list()):
-        if '.' not in item:
-            raise ValueError(f"Item mal formado, sin '.': {item}")
-        self = str.__new__(cls, item)
-        # Lookaheads are IGNORED for LR(0) identity
-        self.lookahead = [] 
-        return self
-
-    def __str__(self):
-        return super(Item, self).__str__()
-
-
-
-def closure(items):
-    def exists(newitem, items):
-        # Only check the core item string since lookaheads are gone
-        for i in items:
-            if i == newitem:
-                return True
-        return False
-
-    global production_list
-
-    while True:
-        flag = 0
-        for i in items:
-            head, body = i.split('→')
-            symbols = split_body_with_dot(body.strip())
-
-            if '.' not in symbols or symbols.index('.') == len(symbols) - 1:
-                continue
+class ClosureCache:
+    """
+    Expands state kernels into full closures on demand, keeping only the
+    `maxsize` most recently used ones.
+    """
 
-            dot_pos = symbols.index('.')
-            B = symbols[dot_pos + 1]  # símbolo después del punto
+    def __init__(self, ctx, expand, maxsize=CLOSURE_CACHE_SIZE):
+        self.ctx = ctx
+        self.expand = expand  # closure(ctx, kernel) del algoritmo
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # estado -> clausura
+
+    def get(self, state):
+        items = self.entries.get(state)
+        if items is None:
+            items = self.entries[state] = self.expand(self.ctx, state.kernel)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(state)
+        return items
 
-            if B not in nt_list:
-                continue
-            
-            # LR(0): We DO NOT compute lookaheads from beta + la
 
-            for prod in firstandfollows.production_list:
-                lhs, rhs = prod.split('→')
-                if lhs.strip() != B:
-                    continue
+class State:
+    def __init__(self, kernel, no, cache, transitions=None):
+        self.kernel = kernel  # ítems núcleo LR(0) como ints (ver Grammar.item_base)
+        self.no = no
+        self.cache = cache
+        # id de símbolo -> número del estado destino, registrado al construir la colección
+        self.transitions = transitions if transitions is not None else OrderedDict()
 
-                rhs_symbols = rhs.strip().split()
-                new_body = '. ' + ' '.join(rhs_symbols)
-                new_item = Item(f"{B}→{new_body}", []) # Empty lookahead
+    @property
+    def closure(self):
+        """ Full item list, expanded from the kernel on demand. """
+        return self.cache.get(self)
 
-                if not exists(new_item, items):
-                    items.append(new_item)
-                    flag = 1
 
-        if not flag:
-            break
+def predictions(ctx):
+    """
+    For every nonterminal B, the items `C→. γ` that closing over B adds,
+    transitively, in closure order. Computed once per grammar.
+    """
+    g = firstandfollows.get_grammar(ctx)
+    if g.lr0_predict is None:
+        g.lr0_predict = [None] * len(g.symbols)
+        for B in g.nonterminals:
+            items = []
+            reached = [B]  # orden de cierre
+            seen = {B}
+            for A in reached:  # la lista crece mientras se recorre
+                for prod_idx in g.prods_by_head[A]:
+                    items.append(g.item_base[prod_idx])
+                    C = g.item_next[g.item_base[prod_idx]]
+                    if C != -1 and not g.is_terminal(C) and C not in seen:
+                        seen.add(C)
+                        reached.append(C)
+            g.lr0_predict[B] = tuple(items)
+    return g.lr0_predict
+
+
+def closure(ctx, items):
+    g = firstandfollows.get_grammar(ctx)
+    predict = predictions(ctx)
+
+    result = list(items)
+    seen = set(result)
+    closed = set()
+    for item in items:
+        B = g.item_next[item]  # símbolo después del punto
+        if B == -1 or g.is_terminal(B) or B in closed:
+            continue
+        closed.add(B)
 
-    return items
+        # LR(0): We DO NOT compute lookaheads from beta + la
+        for new_item in predict[B]:
+            if new_item not in seen:
+                seen.add(new_item)
+                result.append(new_item)
 
-def split_body_with_dot(body):
-    result = []
-    i = 0
-    while i < len(body):
-        if body[i] == '.':
-            result.append('.')
-            i += 1
-        elif body[i] == ' ':
-            i += 1  # ignora espacios extra
-        else:
-            sym = ''
-            while i < len(body) and body[i] not in ['.', ' ']:
-                sym += body[i]
-                i += 1
-            result.append(sym)
-    
-    # Filter out Lambda/Epsilon from the result to treat them as empty
-    # But keep '.'
-    # The generator uses 'λ' (from code constant/string)
-    LAMBDA_SYMBOLS = ['λ', 'ε']
-    filtered_result = [x for x in result if x not in LAMBDA_SYMBOLS]
-    
-    # Special case: If the body was JUST lambda/epsilon (now empty), we have [].
-    # But we might have the dot.
-    # If original was "A -> . λ", split gives ['.', 'λ']. Filtered gives ['.'].
-    # If original was "A -> λ .", split gives ['λ', '.']. Filtered gives ['.']. 
-    # This correctly reduces to "A -> ." 
-    
-    return filtered_result
+    return result
 
 
-def pretty_print_items(items, codigos_equivalentes={}):
+def pretty_print_items(ctx, items, codigos_equivalentes={}):
+    g = firstandfollows.get_grammar(ctx)
     for item in items:
         # Remplaza '.' por '●' solo para mostrar
-        item_str = item.replace('.', '●').replace('→', '->')
+        item_str = g.item_str(item).replace('.', '●').replace('→', '->')
 
         # Reemplazar símbolos codificados por su forma legible
         if codigos_equivalentes:
             for codigo, texto in codigos_equivalentes.items():
                 item_str = item_str.replace(codigo, texto)
 
-        for lookahead in item.lookahead:
-            lookahead_str = codigos_equivalentes.get(lookahead, lookahead) if codigos_equivalentes else lookahead
-            print(f"[ {item_str}, {lookahead_str} ]")
+        print(f"[ {item_str} ]")
 
-def format_states_lr0(states, codigos_equivalentes={}, show_lambda=False, empty_symbol='λ'):
+def format_states_lr0(ctx, states, codigos_equivalentes={}, show_lambda=False, empty_symbol='λ'):
+    g = firstandfollows.get_grammar(ctx)
     result = []
     for idx, state in enumerate(states):
         result.append(f"Item{idx}{{")
-        # Ensure we can handle State objects or raw lists
-        items = state.closure if hasattr(state, 'closure') else state
-        for item in items:
-             
-             head, body = item.split('→')
+        for item in state.closure:
              
-             # Sanitize body for display: Remove internal λ/ε if present
-             for bad_sym in ['λ', 'ε']:
-                 body = body.replace(bad_sym, "")
+             head, body = g.item_str(item).split('→')
              
              # Handle dot and arrow
              body_display = body.replace('.', '●').strip()
@@ -163,188 +138,98 @@ def format_states_lr0(states, codigos_equivalentes={}, show_lambda=False, empty_
     return "\n".join(result)
 
 
-def goto(items, symbol):
-    initial = []
+def goto(ctx, items, symbol):
+    """ Closure of the items in `items` with the dot moved over `symbol` (a symbol id). """
+    g = firstandfollows.get_grammar(ctx)
+    return closure(ctx, [item + 1 for item in items if g.item_next[item] == symbol])
 
-    for i in items:
-        head, body = i.split('→')
-        symbols = split_body_with_dot(body.strip())
 
-        if '.' not in symbols:
-            continue
-
-        dot_pos = symbols.index('.')
-
-        # Verificamos si hay símbolo después del punto
-        if dot_pos + 1 < len(symbols) and symbols[dot_pos + 1] == symbol:
-            # Mover el punto a la derecha del símbolo actual
-            new_symbols = symbols[:dot_pos] + [symbol, '.'] + symbols[dot_pos + 2:]
-            new_body = ' '.join(new_symbols)
-            initial.append(Item(f"{head}→{new_body}", i.lookahead))
-
-    return closure(initial)
-
-
-
-def calc_states():
-    def contains(states, t):
-
-        for s in states:
-            if len(s) != len(t): continue
-
-            if sorted(s) == sorted(t):
-                # For LR(0), we only care about core items (lookaheads are ignored)
-                return True
-                
-                # Original CLR logic for reference:
-                # for i in range(len(s)):
-                #     if s[i].lookahead != t[i].lookahead: break
-                # else:
-                #     return True
-
-        return False
-
-    global nt_list, t_list
-
-    head, body = firstandfollows.production_list[0].split('→')
-
-    states = [closure([Item(head + '→.' + body, [])])]
-
-    while True:
-        flag = 0
-        for s in states:
+def state_key(kernel):
+    """ Canonical hashable identity of a state: the set of its kernel items. """
+    return frozenset(kernel)
 
-            for e in nt_list + t_list:
 
-                t = goto(s, e)
-                if t == [] or contains(states, t): continue
-
-                states.append(t)
-                flag = 1
-
-        if not flag: break
+def successors(ctx, items):
+    """
+    (symbol id, kernel) of every goto from the closure `items`: nonterminals
+    first, then terminals, in grammar order.
+    """
+    g = firstandfollows.get_grammar(ctx)
+    kernels = {}
+    for item in items:
+        if g.item_next[item] != -1:
+            kernels.setdefault(g.item_next[item], []).append(item + 1)
+    return [(sym, tuple(kernels[sym])) for sym in sorted(kernels, key=lambda sym: (g.is_terminal(sym), sym))]
+
+
+def calc_states(ctx):
+    g = firstandfollows.get_grammar(ctx)
+    cache = ClosureCache(ctx, closure)
+
+    start = (g.item_base[0],)
+    states = [State(start, 0, cache)]
+    # Registro de estados: clave canónica -> número de estado
+    registry = {state_key(start): 0}
+
+    # Cada estado se procesa una sola vez, en orden de creación;
+    # sólo se guarda su núcleo, la clausura se vuelve a derivar al necesitarla
+    pending = deque(states)
+    while pending:
+        s = pending.popleft()
+        for e, kernel in successors(ctx, closure(ctx, s.kernel)):
+            key = state_key(kernel)
+            if key not in registry:
+                registry[key] = len(states)
+                states.append(State(kernel, len(states), cache))
+                pending.append(states[-1])
+            s.transitions[e] = registry[key]
 
     return states
 
 
-def make_table(states):
-    global nt_list, t_list
-
-    def getstateno(t):
-        for s in states:
-            if len(s.closure) != len(t):
-                continue
-            if sorted(s.closure) == sorted(t):
-                for i in range(len(s.closure)):
-                    if s.closure[i].lookahead != t[i].lookahead:
-                        break
-                else:
-                    return s.no
-        return -1
-
-    def getprodno(item):
-        head, body = item.split('→')
-        body_without_dot = body.replace('.', '').strip()
-        clean = head.strip() + '→' + body_without_dot
-        for i, prod in enumerate(firstandfollows.production_list):
-            if prod.strip() == clean:
-                return i
-        return -1
+def make_table(ctx, states):
+    g = firstandfollows.get_grammar(ctx)
+    t_list = list(ctx.t_list.keys()) + ['$']
 
     SLR_Table = OrderedDict()
 
-    for i in range(len(states)):
-        states[i] = State(states[i])  # Asigna números de estado
-
     for s in states:
         SLR_Table[s.no] = OrderedDict()
 
         for item in s.closure:
-            head, body = item.split('→')
-            body_symbols = split_body_with_dot(body.strip())
-
-
-            if body_symbols == ['.']:  # Producción completamente reducida
-                # LR(0): Reduce on ALL terminals (including $)
-                for term in t_list:
-                    if term not in SLR_Table[s.no].keys():
-                        SLR_Table[s.no][term] = {'r' + str(getprodno(item))}
-                    else:
-                        SLR_Table[s.no][term] |= {'r' + str(getprodno(item))}
-                continue
+            prod_idx = g.item_prod[item]
 
-            try:
-                dot_pos = body_symbols.index('.')
-            except ValueError:
-                raise ValueError(f"Producción inválida sin punto: {item}")
-
-            if dot_pos == len(body_symbols) - 1:
+            if g.item_next[item] == -1:
                 # Punto al final (producción lista para reducir)
-                if getprodno(item) == 0:
+                if prod_idx == 0:
                     SLR_Table[s.no]['$'] = 'Aceptar'
                 else:
-                    # LR(0): Reduce on ALL terminals
+                    # LR(0): Reduce on ALL terminals (including $)
                     for term in t_list:
                         if term not in SLR_Table[s.no].keys():
-                            SLR_Table[s.no][term] = {'r' + str(getprodno(item))}
+                            SLR_Table[s.no][term] = {'r' + str(prod_idx)}
+                        elif isinstance(SLR_Table[s.no][term], set):
+                            SLR_Table[s.no][term] |= {'r' + str(prod_idx)}
                         else:
-                            SLR_Table[s.no][term] |= {'r' + str(getprodno(item))}
+                            # 'Aceptar' ya en la celda: conflicto con la aceptación
+                            SLR_Table[s.no][term] = {SLR_Table[s.no][term], 'r' + str(prod_idx)}
                 continue
 
-            # Punto no al final: shift o goto
-            nextsym = body_symbols[dot_pos + 1]
-            t = goto(s.closure, nextsym)
-            if t != []:
-                if nextsym in t_list:
-                    if nextsym not in SLR_Table[s.no].keys():
-                        SLR_Table[s.no][nextsym] = {'s' + str(getstateno(t))}
-                    else:
-                        SLR_Table[s.no][nextsym] |= {'s' + str(getstateno(t))}
+            # Punto no al final: shift o goto (transición registrada en calc_states)
+            nextsym = g.symbols[g.item_next[item]]
+            target = s.transitions[g.item_next[item]]
+            if nextsym in t_list:
+                if nextsym not in SLR_Table[s.no].keys():
+                    SLR_Table[s.no][nextsym] = {'s' + str(target)}
                 else:
-                    SLR_Table[s.no][nextsym] = str(getstateno(t))
+                    SLR_Table[s.no][nextsym] |= {'s' + str(target)}
+            else:
+                SLR_Table[s.no][nextsym] = str(target)
 
     return SLR_Table
 
-def make_table_slr(states):
-    global nt_list, t_list
-    
-    # 1. State Object Conversion
-    for i in range(len(states)):
-        if not isinstance(states[i], State):
-            states[i] = State(states[i])
-
-    def getstateno(t):
-        for s in states:
-            if len(s.closure) != len(t):
-                continue
-            s_set = set(str(x) for x in s.closure)
-            t_set = set(str(x) for x in t)
-            if s_set == t_set:
-                 return s.no
-        return -1
-
-    def getprodno(item):
-        """
-        Robustly finds production index by comparing token lists,
-        ignoring whitespace differences.
-        """
-        item_head, item_body = item.split('→')
-        # Remove dot and excess whitespace
-        item_body_clean = item_body.replace('.', ' ').strip()
-        item_tokens = item_body_clean.split()
-        
-        # Handle Lambda/Epsilon in item body if it was purely that
-        # (Though usually formatted items keep their structure)
-        
-        item_head = item_head.strip()
-        
-        for i, prod in enumerate(firstandfollows.production_list):
-            prod_head, prod_body = prod.split('→')
-            prod_tokens = prod_body.strip().split()
-            
-            if item_head == prod_head.strip() and item_tokens == prod_tokens:
-                return i
-        return -1
+def make_table_slr(ctx, states):
+    g = firstandfollows.get_grammar(ctx)
 
     Table = OrderedDict()
 
@@ -354,33 +239,16 @@ def make_table_slr(states):
 
     for s in states:
         for item in s.closure:
-            head, body = item.split('→')
-            body_symbols = split_body_with_dot(body.strip())
-
-            # CASE 1: Reduce checks
-            # Logic: If dot is last, or body became only '.' (from A->. or A->.λ)
-            
-            # Check effectively if it is a reduce item
-            # We can check if 'dot' is at the end of the filtered symbols
-            is_reduce = False
-            if body_symbols == ['.']: 
-                is_reduce = True
-            elif '.' in body_symbols and body_symbols.index('.') == len(body_symbols) - 1:
-                is_reduce = True
-                
-            if is_reduce:
-                prod_idx = getprodno(item)
-                
-                if prod_idx == -1:
-                    print(f"Warning: Could not find production for item {item}")
-                    continue
+            prod_idx = g.item_prod[item]
 
+            # CASE 1: Reduce (dot at the end; A->. for λ/ε bodies)
+            if g.item_next[item] == -1:
                 if prod_idx == 0:
                     # Accept State: S' -> S .
                     Table[s.no]['$'] = 'Aceptar'
                 else:
                     # SLR(1) Logic: Reduce only on Follow(Head)
-                    follow_set = firstandfollows.get_siguiente(head.strip())
+                    follow_set = firstandfollows.get_siguiente(ctx, g.head_name(prod_idx))
                     
                     if not follow_set:
                         # Should not happen for reachable non-terminals, but safety check
@@ -398,68 +266,48 @@ def make_table_slr(states):
                 continue
 
             # CASE 2: Shift or Goto
-            try:
-                if '.' in body_symbols:
-                    dot_pos = body_symbols.index('.')
-                    if dot_pos + 1 < len(body_symbols):
-                        nextsym = body_symbols[dot_pos + 1]
-                        
-                        t = goto(s.closure, nextsym)
-                        if t != []:
-                            next_state_id = getstateno(t)
-                            
-                            if nextsym in t_list:
-                                # SHIFT
-                                action = 's' + str(next_state_id)
-                                if nextsym not in Table[s.no].keys():
-                                    Table[s.no][nextsym] = {action}
-                                else:
-                                     val = Table[s.no][nextsym]
-                                     if isinstance(val, set):
-                                         val.add(action)
-                                     else:
-                                         Table[s.no][nextsym] = {val, action}
-                            else:
-                                # GOTO
-                                Table[s.no][nextsym] = str(next_state_id)
-                        
-            except ValueError:
-                 pass
-            except IndexError:
-                 pass
+            nextsym = g.symbols[g.item_next[item]]
+            next_state_id = s.transitions[g.item_next[item]]
+
+            if g.is_terminal(g.item_next[item]):
+                # SHIFT
+                action = 's' + str(next_state_id)
+                if nextsym not in Table[s.no].keys():
+                    Table[s.no][nextsym] = {action}
+                else:
+                     val = Table[s.no][nextsym]
+                     if isinstance(val, set):
+                         val.add(action)
+                     else:
+                         Table[s.no][nextsym] = {val, action}
+            else:
+                # GOTO
+                Table[s.no][nextsym] = str(next_state_id)
                  
     return Table
 
 
-def augment_grammar():
+def augment_grammar(ctx):
     for i in range(ord('Z'), ord('A') - 1, -1):
         new_start = chr(i)
-        if new_start not in firstandfollows.nt_list:
-            start_prod = firstandfollows.production_list[0]
-            firstandfollows.production_list.insert(0, new_start + '→' + start_prod.split('→')[0])
-            firstandfollows.nt_list[new_start] = firstandfollows.NonTerminal(new_start)
+        if new_start not in ctx.nt_list:
+            start_symbol = firstandfollows.get_grammar(ctx).head_name(0)
+            ctx.production_list.insert(0, new_start + '→' + start_symbol)
+            ctx.nt_list[new_start] = firstandfollows.NonTerminal(new_start)
+            firstandfollows.compile_grammar(ctx)
+            firstandfollows.compute_first_follow_bits(ctx)
             return
 
 import sys
 def main():
-    global production_list, ntl, nt_list, tl, t_list
-
     print("Ingresa los símbolos NO TERMINALES separados por |:")
     non_terminal_input = input().strip()
     non_terminal_symbols = non_terminal_input.split('|')
 
-    firstandfollows.nt_list.clear()
-    for nt in non_terminal_symbols:
-        firstandfollows.nt_list[nt] = firstandfollows.NonTerminal(nt)
-
     print("\nIngresa los símbolos TERMINALES separados por |:")
     terminal_input = input().strip()
     terminal_symbols = terminal_input.split('|')
 
-    firstandfollows.t_list.clear()
-    for term in terminal_symbols:
-        firstandfollows.t_list[term] = firstandfollows.Terminal(term)
-
     print("\nPega tus producciones (una por línea).")
     print("Cuando termines, presiona Enter en una línea vacía:")
 
@@ -482,31 +330,23 @@ def main():
         original_stdout = sys.stdout
         sys.stdout = f  # Redirige toda la salida print al archivo
     # Aqui acaba
-    production_list[:] = user_productions
-
-    firstandfollows.main(production_list)
+    ctx = firstandfollows.BuildContext(user_productions, terminal_symbols, non_terminal_symbols)
 
     print("\tPRIMERO Y SIGUIENTE DE NO TERMINALES")
     
-    firstandfollows.compute_all_primeros()
-    firstandfollows.compute_all_siguientes()
+    firstandfollows.compute_first_follow_bits(ctx)
     
-    for nt in ntl:
-        first = sorted(firstandfollows.get_primero(nt))
-        follow = sorted(firstandfollows.get_siguiente(nt))
+    for nt, nt_obj in ctx.nt_list.items():
         print(nt)
-        print("\tPrimero:\t", firstandfollows.get_primero(nt))
-        print("\tSiguiente:\t", firstandfollows.get_siguiente(nt), "\n")
-
-    augment_grammar()
+        print("\tPrimero:\t", nt_obj.primero)
+        print("\tSiguiente:\t", nt_obj.siguiente, "\n")
 
-    nt_list = list(ntl.keys())
-    t_list = list(tl.keys()) + ['$']
+    augment_grammar(ctx)
 
-    print(nt_list)
-    print(t_list, "\n")
+    print(list(ctx.nt_list.keys()))
+    print(list(ctx.t_list.keys()) + ['$'], "\n")
 
-    j = calc_states()
+    j = calc_states(ctx)
 
     #CON ESTE EXPORTAMOS EN PDF
     #export_items_to_pdf(j, codigos_equivalentes, filename="items_clr1.pdf")
@@ -514,10 +354,10 @@ def main():
     ctr = 0
     for idx, state in enumerate(j):
         print(f"Item{idx}{{")  # ACA SER CAMBIA EL ITEM POR I SI QUIERES
-        pretty_print_items(state, codigos_equivalentes)
+        pretty_print_items(ctx, state.closure, codigos_equivalentes)
         print("}\n")
 
-    table = make_table(j)
+    table = make_table(ctx, j)
 
     print("\n\tCLR(1) TABLE\n")
 
@@ -613,7 +453,8 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
 import textwrap
 
-def export_lr0_items_to_pdf(states, filename="states_lr0.pdf", show_lambda=False, empty_symbol='λ'):
+def export_lr0_items_to_pdf(ctx, states, filename="states_lr0.pdf", show_lambda=False, empty_symbol='λ'):
+    g = firstandfollows.get_grammar(ctx)
     c = canvas.Canvas(filename, pagesize=A4)
     width, height = A4
     margin = inch
@@ -632,12 +473,8 @@ def export_lr0_items_to_pdf(states, filename="states_lr0.pdf", show_lambda=False
         c.drawString(margin, y, titulo)
         y -= 16
 
-        for item in (state.closure if hasattr(state, 'closure') else state):
-             head, body = item.split('→')
-             
-             # Sanitize
-             for bad_sym in ['λ', 'ε']:
-                 body = body.replace(bad_sym, "")
+        for item in state.closure:
+             head, body = g.item_str(item).split('→')
              
              body_display = body.replace('.', '●').strip()
              body_display = " ".join(body_display.split())
@@ -672,143 +509,211 @@ def export_lr0_items_to_pdf(states, filename="states_lr0.pdf", show_lambda=False
     print(f"✅ PDF generado: {filename}")
 
 
-def parse(table, input_string):
+def _compiled(ctx, table):
+    if not isinstance(table, (parse_tables.LRTable, parse_tables.PackedLRTable)):
+        table = parse_tables.compile_lr_table(ctx, table)
+    return table
+
+
+def _drive(table, tokens, max_steps=None, shift=None, reduce=None, step=None, stack=None):
+    """
+    The LR driver loop behind parse, recognize and evaluate: one state
+    stack popped in place, symbol ids only, tokens pulled one at a time.
+    Optional hooks:
+        step(code, cursor)     before each action (the ACTION code)
+        shift(token)           value pushed for a shifted token
+        reduce(prod, values)   value pushed for a reduction, given the
+                               popped values left to right
+    A value stack parallel to the state stack is kept only with `reduce`
+    (shifted tokens push themselves when there is no `shift`). Hooks that
+    need the state just pushed pass their own `stack` list ([0]) and read
+    stack[-1].
+    Returns (outcome, result): ('accept', value of the start symbol, None
+    without `reduce`), or ('error' | 'goto_error' | 'max_steps' | 'loop',
+    position reached).
+    """
+    g = table.grammar
+    action_at, goto_at = table.action_at, table.goto_at
+    heads = [head for head, _ in g.productions]
+    lengths = [len(body) for _, body in g.productions]
+
+    if isinstance(tokens, str):
+        tokens = tokens.split()
+    tokens = iter(tokens)
+    tok = next(tokens, None)
+    sym = g.eof if tok is None else parse_tables.token_id(g, tok)
+
+    # Una gramática ambigua (conflicto resuelto) o cíclica puede reducir
+    # sin fin sin leer nada: la guarda lo detecta de forma exacta
+    guard = parse_tables.LoopGuard()
+    n_symbols = len(g.symbols)
+
+    if stack is None:
+        stack = [0]
+    values = [] if reduce else None  # valores paralelos a la pila (sin el fondo)
+    cursor = 0
+    steps = 0
+
+    while True:
+        if max_steps is not None and steps >= max_steps:
+            return 'max_steps', cursor
+        steps += 1
+
+        code = action_at(stack[-1], sym) if sym != -1 else parse_tables.ERROR
+        if step:
+            step(code, cursor)
+
+        if code > 0:
+            # SHIFT
+            stack.append(code - 1)
+            if reduce:
+                values.append(shift(tok) if shift else tok)
+            cursor += 1
+            tok = next(tokens, None)
+            sym = g.eof if tok is None else parse_tables.token_id(g, tok)
+            guard.reset()
+
+        elif code == parse_tables.ACCEPT:
+            return 'accept', (values[-1] if reduce else None)
+
+        elif code == parse_tables.ERROR:
+            return 'error', cursor
+
+        else:
+            # REDUCE: pop |beta| entries (λ/ε bodies are already empty), then GOTO
+            prod_idx = -code - 1
+            n, head = lengths[prod_idx], heads[prod_idx]
+            if n:
+                del stack[-n:]
+            if guard.repeats(stack[-1] * n_symbols + head, len(stack)):
+                return 'loop', cursor
+            target = goto_at(stack[-1], head)
+            if target == -1:
+                return 'goto_error', cursor
+            stack.append(target)
+
+            if reduce:
+                children = values[len(values) - n:]
+                del values[len(values) - n:]
+                values.append(reduce(prod_idx, children))
+
+
+# Resultado de _drive -> primer elemento de recognize / evaluate
+_ACCEPTED = {'accept': True, 'error': False, 'goto_error': False, 'max_steps': None, 'loop': None}
+
+
+def parse(ctx, table, input_string, max_steps=1000):
     """
-    Simulates LR(0) parsing for the given input string.
-    Returns a list of steps, where each step is a dict:
+    Simulates LR parsing (LR(0), SLR(1), CLR(1), LALR(1)) for the given input
+    string. `table` is a parse_tables.LRTable or PackedLRTable, or a
+    make_table-style dict that is compiled first. The trace grows with the
+    input, so it stops after `max_steps` steps (None for no limit); use
+    recognize for long inputs. It also stops, with a final "Terminated"
+    row, when the table would reduce forever without reading (see
+    parse_tables.LoopGuard), so it returns even without a limit.
+    Returns a parse_trace.LRTrace: a sequence of steps, each rendered on
+    access as a dict:
     {
         'stack': str,   # State Stack
         'symbols': str, # Symbol Stack
         'input': str,   # Input Buffer
         'action': str   # Action Taken
     }
+    A step taken on a conflicting cell, which the compiled table resolved
+    (shift, then accept, then the lowest production), notes the cell's
+    actions after the one it took, e.g. "Shift 4 (conflict: r2/s4)".
     """
-    global production_list
+    table = _compiled(ctx, table)
+    g = table.grammar
     
-    # 1. Tokenize Input
     tokens = input_string.strip().split()
-    tokens.append('$') # Append EOF
     
-    # 2. Initialize Stacks
-    state_stack = [0]
-    symbol_stack = [] # Removed '$' as requested by user
+    # The trace keeps the stack as parent-linked nodes; `top` is the current
+    # node (the bottom holds state 0 and no symbol) and the driver's values
+    # are the nodes themselves
+    trace = parse_trace.LRTrace(g, tokens + ['$'], table.conflicts)
+    node_parent = trace.node_parent
+    stack = [0]
+    top = 0
     
-    steps = []
+    def step(code, cursor):
+        trace.record(top, code, cursor)
     
-    cursor = 0
-    max_steps = 1000 # Safety break
-    step_count = 0
+    def shift(tok):
+        nonlocal top
+        top = trace.push(top, stack[-1], g.ids[tok])
+        return top
     
-    accepted = False
+    def reduce(prod_idx, children):
+        nonlocal top
+        if children:
+            top = node_parent[children[0]]
+        top = trace.push(top, stack[-1], g.productions[prod_idx][0])
+        return top
     
-    while step_count < max_steps:
-        current_state = state_stack[-1]
-        current_input = tokens[cursor]
-        
-        # Snapshot state
-        steps.append({
-            'stack': " ".join(map(str, state_stack)),
-            'symbols': " ".join(symbol_stack),
-            'input': " ".join(tokens[cursor:]),
-            'action': ""
-        })
-        
-        step_idx = len(steps) - 1
-        
-        # Look up action
-        # Table format: table[state_id][symbol] = {'sN'} or {'rN'} or 'Aceptar'
-        
-        row = table.get(current_state, {})
-        action_set = row.get(current_input)
-        
-        if not action_set:
-            steps[step_idx]['action'] = f"Error: No action for input '{current_input}' in state {current_state}"
-            return steps # Fail
-            
-        # Resolve Set
-        # If conflict, we just take the first one for simulation purposes or error
-        if isinstance(action_set, set):
-            action = list(action_set)[0]
-            if len(action_set) > 1:
-                steps[step_idx]['action'] = f"Conflict: {action_set}. Chose {action}"
-        else:
-            action = action_set # Could be 'Aceptar' string directly based on logic
-            
-        # Execute Action
-        if action == 'Aceptar':
-            steps[step_idx]['action'] = "Accept"
-            accepted = True
-            break
-            
-        elif action.startswith('s'):
-            # SHIFT
-            next_state = int(action[1:])
-            
-            steps[step_idx]['action'] = f"Shift {next_state}"
-            
-            state_stack.append(next_state)
-            symbol_stack.append(current_input)
-            cursor += 1
-            
-        elif action.startswith('r'):
-            # REDUCE
-            prod_idx = int(action[1:])
-            production = production_list[prod_idx]
-            lhs, rhs = production.split('→')
-            lhs = lhs.strip()
-            rhs_body = rhs.strip()
-            
-            # Determine RHS length (beta)
-            # Handle Lambda/Epsilon
-            rhs_symbols = []
-            if rhs_body not in ['λ', 'ε', '']:
-                 rhs_symbols = rhs_body.split()
-            
-            count_to_pop = len(rhs_symbols)
-            
-            # Pop from stacks
-            if count_to_pop > 0:
-                state_stack = state_stack[:-count_to_pop]
-                symbol_stack = symbol_stack[:-count_to_pop]
-            
-            # Note: Do not advance cursor
-            
-            # GOTO
-            top_state = state_stack[-1]
-            goto_row = table.get(top_state, {})
-            goto_state_raw = goto_row.get(lhs)
-            
-            if not goto_state_raw:
-                steps[step_idx]['action'] = f"Reduce {prod_idx} ({production}), but GOTO error on [{top_state}, {lhs}]"
-                return steps
-                
-            # Goto could be a set or string/int depending on how make_table saves NTs
-            # In make_table: SLR_Table[s.no][nextsym] = str(getstateno(t)) (string)
-            if isinstance(goto_state_raw, set):
-                 goto_state = int(list(goto_state_raw)[0])
-            else:
-                 goto_state = int(goto_state_raw)
-                 
-            state_stack.append(goto_state)
-            symbol_stack.append(lhs)
-            
-            steps[step_idx]['action'] = f"Reduce {prod_idx}: {production}"
-            
-        else:
-            steps[step_idx]['action'] = f"Unknown action: {action}"
-            return steps
-            
-        step_count += 1
-        
-    if not accepted and step_count >= max_steps:
-         steps.append({
-            'stack': "...",
-            'symbols': "...",
-            'input': "...",
-            'action': "Terminated: Max steps reached"
-        })
-        
-    return steps
+    outcome, _ = _drive(table, tokens, max_steps, shift, reduce, step, stack)
+    if outcome in ('goto_error', 'max_steps', 'loop'):
+        trace.end = outcome
+    return trace
+
+
+def recognize(ctx, table, tokens, max_steps=None, build_tree=False):
+    """
+    Trace-free LR recognizer for long inputs: no step snapshots, the state
+    stack is popped in place and only symbol ids are compared.
+    `tokens` is any iterable of tokens (list, generator, a file read token
+    by token...) or a space-separated string, without '$'. Tokens are pulled
+    one at a time, so memory is bounded by the parse stack. `table` as in
+    parse. `max_steps` optionally caps the number of shift/reduce steps.
+    Returns (accepted, error_position): error_position is the index of the
+    offending token (the token count for an unexpected end of input), or
+    None when the input is accepted. When the step budget runs out first,
+    or the table would reduce forever without reading (a resolved conflict
+    or a derivation cycle, see parse_tables.LoopGuard), the result is
+    (None, position reached).
+    With `build_tree` the first element is the parse tree of the start
+    symbol (parse_tree.ParseTree, built bottom-up on each reduce) instead,
+    or None when the input is not accepted.
+    """
+    table = _compiled(ctx, table)
+    if not build_tree:
+        outcome, result = _drive(table, tokens, max_steps)
+        return _ACCEPTED[outcome], (None if outcome == 'accept' else result)
+
+    tree = parse_tree.ParseTree(table.grammar)
+    heads = [head for head, _ in table.grammar.productions]
+
+    def reduce(prod_idx, children):
+        # El nodo del lado izquierdo adopta los |beta| nodos desapilados
+        node = tree.add(heads[prod_idx])
+        tree.adopt(node, children)
+        return node
+
+    ids = table.grammar.ids
+    outcome, result = _drive(table, tokens, max_steps, lambda tok: tree.add(ids[tok]), reduce)
+    if outcome != 'accept':
+        return None, result
+    tree.root = result
+    return tree, None
+
+
+def evaluate(ctx, table, tokens, on_reduce, on_shift=None, max_steps=None):
+    """
+    LR driver with semantic actions: computes a value in the same pass as
+    the parse, with no trace and no tree. A value stack runs parallel to
+    the state stack: each shifted token pushes on_shift(token) (the token
+    itself by default), and each reduction by production p pops the values
+    of its body and pushes on_reduce(p, values), `values` being the list
+    of those child values left to right (empty for λ/ε). The augmented
+    production 0 is not reduced; its child's value is the result.
+    `tokens` and `max_steps` as in recognize, `table` as in parse.
+    Returns (True, value) when accepted, (False, error_position) on a
+    syntax error, or (None, position reached) when the step budget runs
+    out or the table would reduce forever.
+    """
+    table = _compiled(ctx, table)
+    outcome, result = _drive(table, tokens, max_steps, on_shift, on_reduce)
+    return _ACCEPTED[outcome], result
 
 
 if __name__ == "__main__":
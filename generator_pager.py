@@ -0,0 +1,89 @@
+import generator_clr
+import firstandfollows
+from collections import deque
+from generator_clr import Item, State, closure, successors
+from generator_lr import ClosureCache
+
+
+def weakly_compatible(old, new):
+    """
+    Pager's weak compatibility of two kernels with the same LR(0) core.
+    `old` and `new` are lists of lookahead bitmasks aligned by item: merging
+    them cannot create a conflict that keeping them apart would avoid unless
+    some pair (i, j) mixes lookaheads across the kernels that neither kernel
+    already mixes on its own.
+    """
+    for i in range(len(old)):
+        for j in range(i + 1, len(old)):
+            if (old[i] & new[j]) or (old[j] & new[i]):
+                if not (old[i] & old[j]) and not (new[i] & new[j]):
+                    return False
+    return True
+
+
+def calc_states_pager(ctx):
+    """
+    LR(1) collection with Pager's merging: a new kernel whose LR(0) core
+    matches an existing state is merged into it when the two are weakly
+    compatible, instead of becoming a separate canonical state. Gives the
+    recognition power of CLR(1) with close to LALR(1) state counts, and
+    never builds the full canonical collection.
+    """
+    g = firstandfollows.get_grammar(ctx)
+    cache = ClosureCache(ctx, closure)
+
+    start = (Item(g.item_base[0], 1 << g.eof),)
+    states = [State(start, 0, cache)]
+    # núcleo LR(0) -> estados con ese núcleo (varios si no eran compatibles)
+    by_core = {frozenset(i.core for i in start): [0]}
+
+    def merge_into(target, kernel):
+        # Une los lookaheads de `kernel` al estado destino; True si creció
+        grew = False
+        lookaheads = {i.core: i.lookahead for i in kernel}
+        for item in states[target].kernel:
+            extra = lookaheads[item.core] & ~item.lookahead
+            if extra:
+                item.lookahead |= extra
+                grew = True
+        return grew
+
+    pending = deque([0])
+    queued = {0}
+    while pending:
+        s = states[pending.popleft()]
+        queued.discard(s.no)
+
+        for e, kernel in successors(ctx, closure(ctx, s.kernel)):
+            target = s.transitions.get(e)
+
+            if target is None:
+                # Primera vez: buscar un estado del mismo núcleo compatible
+                core = frozenset(i.core for i in kernel)
+                for candidate in by_core.get(core, ()):
+                    old = {i.core: i.lookahead for i in states[candidate].kernel}
+                    if weakly_compatible([old[i.core] for i in kernel], [i.lookahead for i in kernel]):
+                        target = candidate
+                        break
+
+                if target is None:
+                    target = len(states)
+                    states.append(State(kernel, target, cache))
+                    by_core.setdefault(core, []).append(target)
+                    pending.append(target)
+                    queued.add(target)
+                    s.transitions[e] = target
+                    continue
+                s.transitions[e] = target
+
+            # Estado existente: los lookaheads nuevos se propagan a sus sucesores
+            if merge_into(target, kernel) and target not in queued:
+                pending.append(target)
+                queued.add(target)
+
+    return states
+
+
+def make_table_pager(ctx, states):
+    # Same layout as a canonical LR(1) table (int state numbers)
+    return generator_clr.make_table(ctx, states)
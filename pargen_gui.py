@@ -8,16 +8,67 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QComboBox, QLabel, QLineEdit, 
                              QPlainTextEdit, QPushButton, QTabWidget, 
                              QTableWidget, QTableWidgetItem, QHeaderView, 
-                             QSplitter, QFrame, QMessageBox, QListWidget, QCheckBox, QFileDialog)
-from PyQt6.QtCore import Qt
+                             QSplitter, QFrame, QMessageBox, QListWidget, QCheckBox, QFileDialog,
+                             QTableView)
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
 from PyQt6.QtGui import QFont, QColor
 
 # Standard Imports
 import firstandfollows
-import generator_ll
 import generator_lr
 import generator_clr
 import generator_lalr
+import parsers
+
+# Columnas de la tabla de pasos: (encabezado, clave del paso)
+LL_STEP_COLUMNS = [("Stack", 'stack'), ("Input Buffer", 'input'), ("Action", 'action')]
+LR_STEP_COLUMNS = [("Stack", 'stack'), ("Symbols", 'symbols'), ("Input", 'input'), ("Action", 'action')]
+
+class ParseStepsModel(QAbstractTableModel):
+    """
+    Table model over a parse trace (parse_trace.LRTrace / LLTrace, or any
+    sequence of step dicts). The view asks only for the visible cells, so a
+    row is rendered when it is scrolled into view, not when the trace is set.
+    """
+    def __init__(self, columns):
+        super().__init__()
+        self.columns = columns
+        self.steps = []
+        self._cached = (-1, None)  # última fila renderizada (se pide celda a celda)
+
+    def set_steps(self, steps, columns=None):
+        self.beginResetModel()
+        self.steps = steps
+        if columns is not None:
+            self.columns = columns
+        self._cached = (-1, None)
+        self.endResetModel()
+
+    def step(self, row):
+        if self._cached[0] != row:
+            self._cached = (row, self.steps[row])
+        return self._cached[1]
+
+    def rowCount(self, parent=QModelIndex()):
+        # Tabla plana: ninguna fila tiene hijos
+        if parent.isValid():
+            return 0
+        return len(self.steps)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return self.step(index.row()).get(self.columns[index.column()][1], '')
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
+        return super().headerData(section, orientation, role)
 
 class GrammarInputPanel(QWidget):
     def __init__(self):
@@ -99,9 +150,10 @@ class ResultsPanel(QWidget):
         self.tree_layout.addWidget(self.parse_btn)
         
         # New Table for Parsing Steps
-        self.parse_steps_table = QTableWidget()
-        self.parse_steps_table.setColumnCount(3)
-        self.parse_steps_table.setHorizontalHeaderLabels(["Stack", "Input Buffer", "Action"])
+        # Rows come from the parse trace and are rendered on demand
+        self.parse_steps_model = ParseStepsModel(LL_STEP_COLUMNS)
+        self.parse_steps_table = QTableView()
+        self.parse_steps_table.setModel(self.parse_steps_model)
         self.parse_steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.tree_layout.addWidget(self.parse_steps_table)
         
@@ -154,7 +206,7 @@ class MainWindow(QMainWindow):
         algo_layout = QHBoxLayout()
         algo_layout.addWidget(QLabel("Algorithm:"))
         self.algo_selector = QComboBox()
-        self.algo_selector.addItems(["LL(1)", "LR(0)", "SLR(1)", "CLR(1)", "LALR(1)"])
+        self.algo_selector.addItems(["LL(1)", "LR(0)", "SLR(1)", "CLR(1)", "LALR(1)", "LR(1) (Pager)"])
         self.algo_selector.setCurrentText("LL(1)")
         algo_layout.addWidget(self.algo_selector)
         algo_layout.addStretch()
@@ -221,7 +273,9 @@ class MainWindow(QMainWindow):
         self.results_panel.chk_show_lambda.stateChanged.connect(self.refresh_states)
 
         # State storage
+        self.current_context = None
         self.current_table = None
+        self.current_parser = None # Built parser (parsers.LLParser / LRParser) the drivers run on
         self.current_states = None
         
         # Initial Visibility Update
@@ -229,7 +283,9 @@ class MainWindow(QMainWindow):
 
     def on_algo_changed(self, algo):
         # 1. Clear Previous Results
+        self.current_context = None
         self.current_table = None
+        self.current_parser = None # Built parser (parsers.LLParser / LRParser) the drivers run on
         self.current_states = None
         
         self.results_panel.table_widget.clear()
@@ -239,8 +295,7 @@ class MainWindow(QMainWindow):
         self.results_panel.first_follow_table.clear()
         self.results_panel.first_follow_table.setRowCount(0)
         
-        self.results_panel.parse_steps_table.clear()
-        self.results_panel.parse_steps_table.setRowCount(0) # Clear rows
+        self.results_panel.parse_steps_model.set_steps([]) # Clear rows
         
         self.results_panel.states_text.clear()
         self.closure_text.clear()
@@ -259,9 +314,7 @@ class MainWindow(QMainWindow):
              self.results_panel.chk_show_lambda.setVisible(False) # Checkbox Hidden
              
              # Setup Steps Table for LL(1)
-             self.results_panel.parse_steps_table.setColumnCount(3)
-             self.results_panel.parse_steps_table.setHorizontalHeaderLabels(["Stack", "Input Buffer", "Action"])
-             self.results_panel.parse_steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+             self.results_panel.parse_steps_model.set_steps([], LL_STEP_COLUMNS)
 
         elif algo == "LR(0)":
              self.intermediate_tabs.setTabVisible(0, False) # Closure Hidden
@@ -275,9 +328,7 @@ class MainWindow(QMainWindow):
 
 
              # Setup Steps Table for LR(0)
-             self.results_panel.parse_steps_table.setColumnCount(4)
-             self.results_panel.parse_steps_table.setHorizontalHeaderLabels(["Stack", "Symbols", "Input", "Action"])
-             self.results_panel.parse_steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+             self.results_panel.parse_steps_model.set_steps([], LR_STEP_COLUMNS)
 
         elif algo == "SLR(1)":
              self.intermediate_tabs.setTabVisible(0, False) # Closure Hidden
@@ -290,9 +341,7 @@ class MainWindow(QMainWindow):
              self.results_panel.chk_show_lambda.setVisible(True) # Checkbox Visible
 
              # Setup Steps Table for SLR(1)
-             self.results_panel.parse_steps_table.setColumnCount(4)
-             self.results_panel.parse_steps_table.setHorizontalHeaderLabels(["Stack", "Symbols", "Input", "Action"])
-             self.results_panel.parse_steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+             self.results_panel.parse_steps_model.set_steps([], LR_STEP_COLUMNS)
 
 
         else: # Other algorithms (LALR, etc.)
@@ -306,9 +355,7 @@ class MainWindow(QMainWindow):
              self.results_panel.chk_show_lambda.setVisible(True) # Checkbox Visible (Requested by user)
 
              # Setup Steps Table for CLR/LALR
-             self.results_panel.parse_steps_table.setColumnCount(4)
-             self.results_panel.parse_steps_table.setHorizontalHeaderLabels(["Stack", "Symbols", "Input", "Action"])
-             self.results_panel.parse_steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+             self.results_panel.parse_steps_model.set_steps([], LR_STEP_COLUMNS)
         
         # Update Export Button Text
         self.update_export_button_text()
@@ -317,7 +364,7 @@ class MainWindow(QMainWindow):
     def update_export_button_text(self):
         # If any LR-based and States tab is active
         algo = self.algo_selector.currentText()
-        if algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)"] and self.results_panel.tabs.currentIndex() == 3:
+        if algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)", "LR(1) (Pager)"] and self.results_panel.tabs.currentIndex() == 3:
             self.results_panel.export_csv_button.setText("Export PDF")
         else:
             self.results_panel.export_csv_button.setText("Export CSV")
@@ -332,43 +379,23 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "All fields are required.")
             return
 
-        # 2. Reset Backend State
-        firstandfollows.nt_list.clear()
-        firstandfollows.t_list.clear()
-        firstandfollows.production_list.clear()
-        # Reset specific module lists if they are separate copies (they seem shared via import)
-        # Reset specific module lists
-        generator_clr.nt_list = []
-        generator_clr.t_list = []
-        generator_lr.nt_list = []
-        # Stale reference removal: No longer setting generator_lr.production_list as it's shared via firstandfollows
-        
-        # Reset state counters
-        generator_clr.State._id = 0
-        generator_lr.State._id = 0
-        
-        # 3. Parse Inputs
-        # Create Objects for NTs
+        # 2. Parse Inputs
         nt_symbols = [x.strip() for x in nt_text.split('|') if x.strip()]
-        for nt in nt_symbols:
-            firstandfollows.nt_list[nt] = firstandfollows.NonTerminal(nt)
-
-        # Create Objects for Terminals
         t_symbols = [x.strip() for x in t_text.split('|') if x.strip()]
-        for t in t_symbols:
-            firstandfollows.t_list[t] = firstandfollows.Terminal(t)
 
         # Add Implicit Terminals
         if self.grammar_panel.chk_lambda.isChecked():
-            firstandfollows.t_list['λ'] = firstandfollows.Terminal('λ')
+            t_symbols.append('λ')
         if self.grammar_panel.chk_epsilon.isChecked():
-            firstandfollows.t_list['ε'] = firstandfollows.Terminal('ε')
-
-        # Parse Productions
+            t_symbols.append('ε')
 
         # Replace '->' with '→' to ensure compatibility with backend (which splits by '→')
         productions = [line.strip().replace('->', '→') for line in prod_text.split('\n') if line.strip()]
-        firstandfollows.production_list[:] = productions # Update in-place to keep references valid
+
+        # 3. Fresh build context: every build owns its symbols, grammar and states
+        ctx = firstandfollows.BuildContext(productions, t_symbols, nt_symbols)
+        firstandfollows.compile_grammar(ctx) # Intern symbols and productions once per build
+        self.current_context = ctx
 
         # 4. Run Logic & Capture Output
         output_capture = io.StringIO()
@@ -382,12 +409,11 @@ class MainWindow(QMainWindow):
             # We calculate this once globally now
             print("--- PRIMERO & SIGUIENTE ---\\n")
             
-            # Execute global computation once
-            firstandfollows.compute_all_primeros()
-            firstandfollows.compute_all_siguientes()
+            # Execute global computation once (bitset engine)
+            firstandfollows.compute_first_follow_bits(ctx)
             
             first_follow_data = {}
-            for nt_name, nt_obj in firstandfollows.nt_list.items():
+            for nt_name, nt_obj in ctx.nt_list.items():
                 # Store for table display
                 first_follow_data[nt_name] = {
                     "first": nt_obj.primero,
@@ -400,114 +426,34 @@ class MainWindow(QMainWindow):
             # Update First & Follow Table
             self.update_first_follow_table(first_follow_data)
 
-            if algo == "LL(1)":
-                  # Note: Tabs visibility is handled by on_algo_changed
-
-                  # LL(1) Specific Logic
+            if algo not in parsers.ALGORITHMS:
+                 QMessageBox.information(self, "Info", f"Algorithm {algo} not yet fully implemented in GUI.")
+                 return
 
-                 # LL(1) Specific Logic
-                 print("--- LL(1) PARSING TABLE ---\\n")
-                 table = generator_ll.compute_ll1_table()
-                 self.current_table = table
-                 self.current_states = None # No format states for LL(1) in the CLR sense
+            # States, table and compiled table in one reusable parser object;
+            # Parse Input runs on it without redoing any table work
+            print(f"--- {algo} ---\\n")
+            parser = parsers.build(ctx, algo)
+            self.current_parser = parser
+            self.current_states = parser.states
+            self.current_table = parser.table
 
+            if algo == "LL(1)":
+                 # Note: Tabs visibility is handled by on_algo_changed
+                 grammar = firstandfollows.get_grammar(ctx)
+                 empty_symbol = 'ε' if self.grammar_panel.chk_epsilon.isChecked() else 'λ'
                  display_table = {}
-                 for nt, row in table.items():
+                 for nt, row in parser.table.items():
                      display_table[nt] = {}
                      for term, p_idx in row.items():
-          
-                         prod = firstandfollows.production_list[p_idx]
-                         _, body = prod.split("→")
-                         display_table[nt][term] = body.strip() # Just the body
+                         display_table[nt][term] = " ".join(grammar.body_names(p_idx)) or empty_symbol # Just the body
                  
                  self.current_table = display_table # Use this for display
                  # Capture nothing else for closure as it doesn't exist
                  self.closure_text.setPlainText("Not applicable for LL(1)")
-
-            elif algo == "CLR(1)":
-                # Step B: Augment Grammar
-                generator_clr.augment_grammar()
-                
-                # Step C: Calc States (Canonical Collection)
-                # Ensure nt_list and t_list are populated AFTER augment_grammar
-                generator_clr.nt_list = list(firstandfollows.nt_list.keys())
-                generator_clr.t_list = list(firstandfollows.t_list.keys()) + ['$']
-
-                print("--- CANONICAL COLLECTION (CLOSURE) ---\\n")
-                states = generator_clr.calc_states()
-                self.current_states = states
-
-                # Populate States Tab (Clean output, no First/Follow mix)
-                self.refresh_states()
-                
-                # Note: Closure tab is hidden for CLR
-                # self.closure_text.setPlainText(output_capture.getvalue())
-
-                # Step D: Make Table
-                table = generator_clr.make_table(states)
-                self.current_table = table
-                
-            elif algo == "LALR(1)":
-                # Augmented Grammar logic (Same as CLR/LR0)
-                generator_clr.augment_grammar()
-                
-                generator_clr.nt_list = list(firstandfollows.nt_list.keys())
-                generator_clr.t_list = list(firstandfollows.t_list.keys()) + ['$']
-                
-                print("--- LALR(1) STATES (Merged) ---\\n")
-                states = generator_lalr.calc_states_lalr()
-                self.current_states = states
-                
-                # Format/Output States
-                self.refresh_states()
-                
-                # Make Table
-                table = generator_lalr.make_table_lalr(states)
-                self.current_table = table
-
-            elif algo == "LR(0)":
-                # Augmented Grammar logic
-                generator_lr.augment_grammar()
-                
-                # UPDATE: Also populate the flat lists required by calc_states
-                generator_lr.nt_list = list(firstandfollows.nt_list.keys())
-                generator_lr.t_list = list(firstandfollows.t_list.keys()) + ['$'] # Add EOF if needed, usually $
-                
-                # Step C: Calc States
-                print("--- LR(0) STATES ---\\n")
-                states = generator_lr.calc_states()
-                self.current_states = states
-                
-                # Format output
-                self.refresh_states()
-                
-                # Step D: Make Table
-                table = generator_lr.make_table(states)
-                self.current_table = table
-
-            elif algo == "SLR(1)":
-                # Augmented Grammar logic
-                generator_lr.augment_grammar()
-                
-                # Update visual lists
-                generator_lr.nt_list = list(firstandfollows.nt_list.keys())
-                generator_lr.t_list = list(firstandfollows.t_list.keys()) + ['$']
-                
-                # Step C: Calc States
-                print("--- SLR(1) STATES ---\\n")
-                states = generator_lr.calc_states()
-                self.current_states = states
-                
-                # Format output
-                self.refresh_states()
-                
-                table = generator_lr.make_table_slr(states)
-                self.current_table = table
-                
             else:
-
-                 QMessageBox.information(self, "Info", f"Algorithm {algo} not yet fully implemented in GUI.")
-                 return
+                 # Populate States Tab (Closure tab is hidden for LR algorithms)
+                 self.refresh_states()
 
         except Exception as e:
             sys.stdout = original_stdout
@@ -521,7 +467,7 @@ class MainWindow(QMainWindow):
         # 5. Update UI
         # self.first_follow_text.setPlainText(first_follow_str) # Removed text view
         self.update_results_table(self.current_table)
-        self.update_productions_list(firstandfollows.production_list)
+        self.update_productions_list(ctx.production_list)
         
         # Adjust tabs visibility based on algo selection (redundant but ensures consistency)
         # self.on_algo_changed(algo) 
@@ -530,7 +476,7 @@ class MainWindow(QMainWindow):
         
     def parse_input_string(self):
         algo = self.algo_selector.currentText()
-        if algo not in ["LL(1)", "LR(0)", "SLR(1)", "CLR(1)", "LALR(1)"]:
+        if algo not in ["LL(1)", "LR(0)", "SLR(1)", "CLR(1)", "LALR(1)", "LR(1) (Pager)"]:
              QMessageBox.warning(self, "Warning", f"Parse Tree is currently not implemented for {algo}.")
              return
 
@@ -544,49 +490,23 @@ class MainWindow(QMainWindow):
              return
              
         if algo == "LL(1)":
-            # We need the ACTUAL table with indices
-            raw_table = generator_ll.compute_ll1_table()
-            start_symbol = list(firstandfollows.nt_list.keys())[0]
-            
-            tokens = input_str.split() 
-            result_node, steps = generator_ll.parse_input(raw_table, start_symbol, tokens)
+            # The built parser holds the compiled table and the start symbol
+            result_node, steps = self.current_parser.parse(input_str.split())
             
             if isinstance(result_node, str):
                 QMessageBox.warning(self, "Parse Error", result_node)
                 
-            # Configure Table for LL(1) (3 Columns)
-            self.results_panel.parse_steps_table.setColumnCount(3)
-            self.results_panel.parse_steps_table.setHorizontalHeaderLabels(["Stack", "Input Buffer", "Action"])
-            self.results_panel.parse_steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-            
-            self.results_panel.parse_steps_table.setRowCount(len(steps))
-            for i, step in enumerate(steps):
-                 self.results_panel.parse_steps_table.setItem(i, 0, QTableWidgetItem(step['stack']))
-                 self.results_panel.parse_steps_table.setItem(i, 1, QTableWidgetItem(step['input']))
-                 self.results_panel.parse_steps_table.setItem(i, 2, QTableWidgetItem(step['action']))
+            # Configure Table for LL(1) (3 Columns); the model renders only the rows in view
+            self.results_panel.parse_steps_model.set_steps(steps, LL_STEP_COLUMNS)
                  
-        elif algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)"]:
+        elif algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)", "LR(1) (Pager)"]:
             # LR-style Simulation
             
-            if algo == "CLR(1)":
-                steps = generator_clr.parse(self.current_table, input_str)
-            elif algo == "LALR(1)":
-                 # LALR uses CLR's parse which now handles string IDs
-                 steps = generator_clr.parse(self.current_table, input_str)
-            else:
-                steps = generator_lr.parse(self.current_table, input_str)
+            # Same driver for every LR table (int state numbers throughout)
+            steps = self.current_parser.parse(input_str)
             
             # Configure Table for LR-style (4 Columns)
-            self.results_panel.parse_steps_table.setColumnCount(4)
-            self.results_panel.parse_steps_table.setHorizontalHeaderLabels(["Stack", "Symbols", "Input", "Action"])
-            self.results_panel.parse_steps_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-            
-            self.results_panel.parse_steps_table.setRowCount(len(steps))
-            for i, step in enumerate(steps):
-                 self.results_panel.parse_steps_table.setItem(i, 0, QTableWidgetItem(step.get('stack', '')))
-                 self.results_panel.parse_steps_table.setItem(i, 1, QTableWidgetItem(step.get('symbols', '')))
-                 self.results_panel.parse_steps_table.setItem(i, 2, QTableWidgetItem(step.get('input', '')))
-                 self.results_panel.parse_steps_table.setItem(i, 3, QTableWidgetItem(step.get('action', '')))
+            self.results_panel.parse_steps_model.set_steps(steps, LR_STEP_COLUMNS)
 
     def update_first_follow_table(self, data):
         self.results_panel.first_follow_table.clear()
@@ -636,9 +556,9 @@ class MainWindow(QMainWindow):
         
         # Check against known terminals from current build
         # Note: We can try to infer from keys or use the stored lists
-        # We use firstandfollows.t_list which should be up to date
+        # We use the terminals declared in the current build context
         
-        known_terminals = set(firstandfollows.t_list.keys())
+        known_terminals = set(self.current_context.t_list.keys()) if self.current_context else set()
         known_terminals.add('$')
         if hasattr(self.grammar_panel, 'chk_lambda') and self.grammar_panel.chk_lambda.isChecked():
              known_terminals.add('λ')
@@ -702,7 +622,7 @@ class MainWindow(QMainWindow):
     def export_csv(self):
         # Check if we should do PDF export instead (LR-based States)
         algo = self.algo_selector.currentText()
-        if algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)"] and self.results_panel.tabs.currentIndex() == 3: # States Tab
+        if algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)", "LR(1) (Pager)"] and self.results_panel.tabs.currentIndex() == 3: # States Tab
              self.export_pdf_states()
              return
         # Determine active tab
@@ -722,7 +642,7 @@ class MainWindow(QMainWindow):
             default_name = "parse_simulation.csv"
 
             
-        if not target_table or target_table.rowCount() == 0:
+        if not target_table or target_table.model().rowCount() == 0:
             QMessageBox.warning(self, "Warning", "No data to export in the current tab.")
             return
 
@@ -735,6 +655,14 @@ class MainWindow(QMainWindow):
             with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
                 writer = csv.writer(csvfile)
                 
+                if current_index == 2: # Parse steps: written straight from the trace, one row at a time
+                    columns = self.results_panel.parse_steps_model.columns
+                    writer.writerow([header for header, _ in columns])
+                    for step in self.results_panel.parse_steps_model.steps:
+                        writer.writerow([step.get(key, '') for _, key in columns])
+                    QMessageBox.information(self, "Success", f"Data exported to {file_path}")
+                    return
+                
                 # Headers
                 headers = []
                 for i in range(target_table.columnCount()):
@@ -771,16 +699,16 @@ class MainWindow(QMainWindow):
 
     def refresh_states(self):
         algo = self.algo_selector.currentText()
-        if algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)"] and self.current_states:
+        if algo in ["LR(0)", "SLR(1)", "CLR(1)", "LALR(1)", "LR(1) (Pager)"] and self.current_states:
              show_lambda = self.results_panel.chk_show_lambda.isChecked()
              empty_symbol = 'ε' if self.grammar_panel.chk_epsilon.isChecked() else 'λ'
              
-             if algo == "CLR(1)":
-                 formatted_states = generator_clr.format_states(self.current_states, show_lambda=show_lambda, empty_symbol=empty_symbol)
+             if algo in ("CLR(1)", "LR(1) (Pager)"):
+                 formatted_states = generator_clr.format_states(self.current_context, self.current_states, show_lambda=show_lambda, empty_symbol=empty_symbol)
              elif algo == "LALR(1)":
-                 formatted_states = generator_lalr.format_states(self.current_states, show_lambda=show_lambda, empty_symbol=empty_symbol)
+                 formatted_states = generator_lalr.format_states(self.current_context, self.current_states, show_lambda=show_lambda, empty_symbol=empty_symbol)
              else:
-                 formatted_states = generator_lr.format_states_lr0(self.current_states, show_lambda=show_lambda, empty_symbol=empty_symbol)
+                 formatted_states = generator_lr.format_states_lr0(self.current_context, self.current_states, show_lambda=show_lambda, empty_symbol=empty_symbol)
                  
              self.results_panel.states_text.setPlainText(formatted_states)
 
@@ -800,8 +728,9 @@ class MainWindow(QMainWindow):
             show_lambda = self.results_panel.chk_show_lambda.isChecked()
             empty_symbol = 'ε' if self.grammar_panel.chk_epsilon.isChecked() else 'λ'
             
-            if algo == "CLR(1)":
+            if algo in ("CLR(1)", "LR(1) (Pager)"):
                 generator_clr.export_items_to_pdf(
+                    self.current_context,
                     self.current_states, 
                     codigos_equivalentes={}, 
                     filename=file_path,
@@ -810,6 +739,7 @@ class MainWindow(QMainWindow):
                 )
             elif algo == "LALR(1)":
                  generator_lalr.export_items_to_pdf(
+                     self.current_context,
                      self.current_states,
                      filename=file_path,
                      show_lambda=show_lambda,
@@ -817,6 +747,7 @@ class MainWindow(QMainWindow):
                  )
             else:
                 generator_lr.export_lr0_items_to_pdf(
+                    self.current_context,
                     self.current_states, 
                     filename=file_path, 
                     show_lambda=show_lambda,
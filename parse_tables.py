@@ -0,0 +1,382 @@
+"""
+Compiled parse tables for the drivers.
+
+The generators return tables as OrderedDicts of strings ('s5', 'r2',
+'Aceptar', {'s5', 'r2'} on conflict), which is what the GUI shows and
+exports. Before parsing they are compiled once into flat int arrays indexed
+by state × grammar symbol id, so a parse step is a single array lookup.
+"""
+from array import array
+import firstandfollows
+
+# Celdas ACTION: 0 error, n+1 desplazar al estado n, -(p+1) reducir por p.
+# La producción 0 es la aumentada (Z→S), así que reducir por ella es aceptar.
+ERROR = 0
+ACCEPT = -1
+
+
+class LRTable:
+    """
+    ACTION rows of n_classes cells and GOTO rows of n_nonterminals cells
+    (-1 where undefined). Terminals whose ACTION columns are identical in
+    every state share a class (`term_class`: terminal id -> column), and
+    states with identical rows share one: `action_row` / `goto_row` map
+    each state to its row. An empty ACTION cell falls back to the row's
+    default action (a reduction, when compiled with default_reductions;
+    else error).
+    """
+
+    def __init__(self, grammar, n_states):
+        self.grammar = grammar
+        self.n_states = n_states
+        self.n_terminals = len(grammar.terminals)
+        self.n_nonterminals = len(grammar.nonterminals)
+        self.n_classes = self.n_terminals
+        self.term_class = array('i', range(self.n_terminals))  # terminal -> columna ACTION
+        self.action_row = array('i', [0]) * n_states  # estado -> fila ACTION
+        self.goto_row = array('i', [0]) * n_states  # estado -> fila GOTO
+        self.action = array('i')
+        self.action_default = array('i')  # fila ACTION -> acción por defecto
+        self.goto = array('i')
+        # (estado, id terminal) -> acciones originales de una celda en conflicto
+        self.conflicts = {}
+
+    def action_at(self, state, sym):
+        row = self.action_row[state]
+        return self.action[row * self.n_classes + self.term_class[sym]] or self.action_default[row]
+
+    def goto_at(self, state, nt):
+        # `nt` is the grammar symbol id of the nonterminal
+        return self.goto[self.goto_row[state] * self.n_nonterminals + nt - self.n_terminals]
+
+    def nbytes(self):
+        arrays = (self.term_class, self.action_row, self.goto_row, self.action, self.action_default, self.goto)
+        return sum(len(a) * a.itemsize for a in arrays)
+
+
+class PackedLRTable:
+    """
+    Row-displacement (comb vector) form of an LRTable, as in yacc/bison.
+
+    ACTION rows (over terminal classes and shared between states, as in
+    LRTable) keep only the cells that differ from the row's default action
+    (its most frequent reduction, or error): the entry for row r and class c
+    lives at base[r] + c when check[base[r] + c] == r. GOTO is packed by nonterminal column the same
+    way, with a default target per nonterminal. A default reduction may fire
+    where the dense table has an error; the error is then found before the
+    next shift, as in yacc.
+    """
+
+    def __init__(self, grammar, n_states):
+        self.grammar = grammar
+        self.n_states = n_states
+        self.n_terminals = len(grammar.terminals)
+        self.n_nonterminals = len(grammar.nonterminals)
+        self.n_classes = self.n_terminals
+        self.term_class = array('i', range(self.n_terminals))
+        self.action_row = array('i', [0]) * n_states
+        self.action_default = array('i')
+        self.action_base = array('i')
+        self.action_check = array('i')
+        self.action_next = array('i')
+        self.goto_default = array('i', [-1]) * self.n_nonterminals
+        self.goto_base = array('i', [0]) * self.n_nonterminals
+        self.goto_check = array('i')
+        self.goto_next = array('i')
+        self.conflicts = {}
+
+    def action_at(self, state, sym):
+        row = self.action_row[state]
+        i = self.action_base[row] + self.term_class[sym]
+        if self.action_check[i] == row:
+            return self.action_next[i]
+        return self.action_default[row]
+
+    def goto_at(self, state, nt):
+        col = nt - self.n_terminals
+        i = self.goto_base[col] + state
+        if self.goto_check[i] == col:
+            return self.goto_next[i]
+        return self.goto_default[col]
+
+    def nbytes(self):
+        arrays = (self.term_class, self.action_row, self.action_default, self.action_base, self.action_check, self.action_next,
+                  self.goto_default, self.goto_base, self.goto_check, self.goto_next)
+        return sum(len(a) * a.itemsize for a in arrays)
+
+
+class LLTable:
+    """ PREDICT as n_nonterminals × n_terminals production numbers (-1 = error). """
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.n_terminals = len(grammar.terminals)
+        self.n_nonterminals = len(grammar.nonterminals)
+        self.predict = array('i', [-1]) * (self.n_nonterminals * self.n_terminals)
+
+
+def encode_action(action):
+    if action == 'Aceptar':
+        return ACCEPT
+    if action.startswith('s'):
+        return int(action[1:]) + 1
+    return -(int(action[1:]) + 1)
+
+
+def _preferred(action):
+    # Conflictos: desplazar antes que aceptar, y aceptar antes que reducir
+    # (la producción de menor número primero), siempre el mismo resultado
+    if action.startswith('s'):
+        return (0, int(action[1:]))
+    if action == 'Aceptar':
+        return (1, 0)
+    return (2, int(action[1:]))
+
+
+def compile_lr_table(ctx, table, default_reductions=False):
+    """
+    Compiles a make_table/make_table_slr/make_table_lalr result (states must
+    be numbered 0..n-1) into an LRTable. Terminals with identical columns
+    collapse into one class and identical rows are stored once.
+    With `default_reductions`, each state's most frequent reduction becomes
+    its default action and its cells (and the error cells) are left empty,
+    so e.g. every LR(0) reduce state collapses to a single shared row; the
+    driver may then reduce before reporting an error, as yacc does.
+    """
+    g = firstandfollows.get_grammar(ctx)
+    compiled = LRTable(g, len(table))
+    n_t, n_nt = compiled.n_terminals, compiled.n_nonterminals
+    actions = [None] * len(table)  # estado -> (acción por defecto, fila por terminal)
+    goto_rows = {}
+
+    for state, row in table.items():
+        action = [ERROR] * n_t
+        goto = [-1] * n_nt
+        for name, cell in row.items():
+            sym = g.ids.get(name)
+            if sym is None:
+                # Columna λ/ε de la tabla LR(0): no es un símbolo de la gramática
+                continue
+
+            if g.is_terminal(sym):
+                actions_in_cell = cell if isinstance(cell, set) else {cell}
+                if len(actions_in_cell) > 1:
+                    compiled.conflicts[(state, sym)] = cell
+                action[sym] = encode_action(min(actions_in_cell, key=_preferred))
+            else:
+                target = min(cell, key=int) if isinstance(cell, set) else cell
+                goto[sym - n_t] = int(target)
+
+        default = _default_reduction(action) if default_reductions else ERROR
+        if default != ERROR:
+            action = [ERROR if code == default else code for code in action]
+        actions[state] = (default, action)
+
+        key = tuple(goto)
+        if key not in goto_rows:
+            goto_rows[key] = len(goto_rows)
+            compiled.goto.extend(goto)
+        compiled.goto_row[state] = goto_rows[key]
+
+    # Clases de terminales: columnas ACTION idénticas en todos los estados
+    classes = {}  # columna -> clase
+    representatives = []  # clase -> primer terminal de la clase
+    for t in range(n_t):
+        column = tuple(action[t] for _, action in actions)
+        if column not in classes:
+            classes[column] = len(representatives)
+            representatives.append(t)
+        compiled.term_class[t] = classes[column]
+    compiled.n_classes = len(representatives)
+
+    action_rows = {}  # (acción por defecto, fila por clase) -> fila compartida
+    for state, (default, action) in enumerate(actions):
+        key = (default, tuple(action[t] for t in representatives))
+        if key not in action_rows:
+            action_rows[key] = len(action_rows)
+            compiled.action.extend(key[1])
+            compiled.action_default.append(default)
+        compiled.action_row[state] = action_rows[key]
+
+    return compiled
+
+
+def compile_ll_table(ctx, table):
+    """ Compiles a compute_ll1_table result ({head: {terminal: prod}}) into an LLTable. """
+    g = firstandfollows.get_grammar(ctx)
+    compiled = LLTable(g)
+    n_t = compiled.n_terminals
+
+    for head, row in table.items():
+        for name, prod_idx in row.items():
+            sym = g.ids.get(name)
+            if sym is not None and g.is_terminal(sym):
+                compiled.predict[(g.ids[head] - n_t) * n_t + sym] = prod_idx
+
+    return compiled
+
+
+def _most_common(values):
+    counts = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    return max(counts, key=lambda v: (counts[v], -abs(v))) if counts else None
+
+
+def _default_reduction(action):
+    # La reducción más frecuente de una fila ACTION (ERROR si no reduce)
+    default = _most_common(code for code in action if code < 0 and code != ACCEPT)
+    return ERROR if default is None else default
+
+
+def _comb(vectors, width):
+    """
+    First-fit row displacement. `vectors` holds one [(col, value)] list per
+    row; returns (base, check, next) with check[base[r] + col] == r for
+    every stored cell. The arrays are padded by `width` so that
+    base[r] + col never runs past the end.
+    """
+    base = array('i', [0]) * len(vectors)
+    check = array('i')
+    nxt = array('i')
+    occupied = 0  # bit p encendido = posición p ya usada
+
+    # Las filas más densas primero, las escasas rellenan los huecos
+    for r in sorted(range(len(vectors)), key=lambda r: -len(vectors[r])):
+        cells = vectors[r]
+        if not cells:
+            continue
+
+        # Bit b de `fits`: la fila cabe con base b (todas sus celdas libres)
+        free = ~occupied
+        fits = -1
+        for col, _ in cells:
+            fits &= free >> col
+        b = (fits & -fits).bit_length() - 1
+
+        top = b + cells[-1][0] + 1
+        if top > len(check):
+            check.extend([-1] * (top - len(check)))
+            nxt.extend([0] * (top - len(nxt)))
+        for col, value in cells:
+            check[b + col] = r
+            nxt[b + col] = value
+            occupied |= 1 << (b + col)
+        base[r] = b
+
+    check.extend([-1] * width)
+    nxt.extend([0] * width)
+    return base, check, nxt
+
+
+def pack_lr_table(table):
+    """
+    Compresses a compiled LRTable into a PackedLRTable (see size_report).
+    """
+    n_c, n_nt = table.n_classes, table.n_nonterminals
+    packed = PackedLRTable(table.grammar, table.n_states)
+    packed.conflicts = dict(table.conflicts)
+    packed.n_classes = n_c
+    packed.term_class = array('i', table.term_class)
+
+    # ACTION: por fila, la reducción más frecuente pasa a ser la acción por
+    # defecto (si la tabla densa no tenía ya una)
+    shared = {}  # (acción por defecto, celdas) -> fila empaquetada
+    rows = []
+    row_map = []  # fila densa -> fila empaquetada
+    for r in range(len(table.action_default)):
+        action = table.action[r * n_c:(r + 1) * n_c]
+        default = table.action_default[r]
+        if default == ERROR:
+            default = _default_reduction(action)
+        cells = [(c, code) for c, code in enumerate(action) if code != ERROR and code != default]
+        key = (default, tuple(cells))
+        if key not in shared:
+            shared[key] = len(rows)
+            rows.append(cells)
+            packed.action_default.append(default)
+        row_map.append(shared[key])
+    for s in range(table.n_states):
+        packed.action_row[s] = row_map[table.action_row[s]]
+    packed.action_base, packed.action_check, packed.action_next = _comb(rows, n_c)
+
+    # GOTO: por no terminal, el destino más frecuente es el de por defecto
+    columns = []
+    for col in range(n_nt):
+        targets = [(s, table.goto[table.goto_row[s] * n_nt + col]) for s in range(table.n_states)]
+        default = _most_common(target for _, target in targets if target != -1)
+        default = -1 if default is None else default
+        packed.goto_default[col] = default
+        columns.append([(s, target) for s, target in targets if target != -1 and target != default])
+    packed.goto_base, packed.goto_check, packed.goto_next = _comb(columns, table.n_states)
+
+    return packed
+
+
+def size_report(dense, packed):
+    """ One-line comparison of the full matrix, dense (shared rows) and packed sizes. """
+    full = dense.n_states * (dense.n_terminals + dense.n_nonterminals) * dense.action.itemsize
+    before, after = dense.nbytes(), packed.nbytes()
+    saved = 100 * (full - after) / full if full else 0
+    return (f"{dense.n_states} states, {dense.n_classes}/{dense.n_terminals} terminal classes: "
+            f"full matrix {full / 1024:.1f} KB, "
+            f"dense {before / 1024:.1f} KB, packed {after / 1024:.1f} KB ({saved:.0f}% smaller)")
+
+
+def token_id(grammar, tok):
+    """ Terminal id of an input token; -1 for anything that is not a terminal. """
+    sym = grammar.ids.get(tok, -1)
+    return sym if sym != -1 and grammar.is_terminal(sym) else -1
+
+
+def symbol_stream(grammar, tokens):
+    """
+    Lazily yields the terminal id of each token, then '$'. `tokens` is any
+    iterable of tokens or a space-separated string.
+    """
+    if isinstance(tokens, str):
+        tokens = tokens.split()
+    for tok in tokens:
+        yield token_id(grammar, tok)
+    yield grammar.eof
+
+
+class LoopGuard:
+    """
+    Exact detection of an endless run of reductions (LR) or expansions
+    (LL) between two shifts / matches, which a conflict resolved at
+    compile time or a derivation cycle (A ⇒+ A) can cause. The lookahead
+    is fixed meanwhile, so what the parser does from a step depends only
+    on that step's key (LR: state left on top by the pop and the reduced
+    nonterminal; LL: the expanded nonterminal) until the stack drops below
+    the step's height. Meeting the same key again before that means the
+    parser repeats itself forever; valid input never trips it, however
+    long its λ-derivations are.
+    """
+
+    def __init__(self):
+        self.heights = []  # alturas de las marcas vigentes (no decrecientes)
+        self.keys = []
+        self.seen = set()
+
+    def reset(self):
+        # Tras desplazar / emparejar el lookahead cambia: marcas nuevas
+        if self.heights:
+            del self.heights[:], self.keys[:]
+            self.seen.clear()
+
+    def repeats(self, key, height):
+        """
+        Marks `key` at stack height `height`; marks above it are dropped
+        (the stack went below them). True if `key` is still marked.
+        """
+        heights = self.heights
+        while heights and heights[-1] > height:
+            heights.pop()
+            self.seen.discard(self.keys.pop())
+        if key in self.seen:
+            return True
+        heights.append(height)
+        self.keys.append(key)
+        self.seen.add(key)
+        return False
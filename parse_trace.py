@@ -0,0 +1,192 @@
+"""
+Compact parse traces for the step-by-step drivers.
+
+A trace stores, per step, only the action code, the top of the stack and
+the input cursor, in int arrays. The stacks themselves are persistent:
+every node keeps its parent, so a push is one node and a pop is a move to
+the parent, and any past stack is still reachable from its top. Rows are
+rendered to the usual step dicts ({'stack', 'symbols', 'input', 'action'}
+for LR, {'stack', 'input', 'action'} for LL) only when indexed, so the GUI
+and the CSV export pay for the rows they show.
+"""
+from array import array
+import parse_tables
+
+# Códigos de paso LL (los >= 0 son producciones expandidas)
+MATCH = -1
+ACCEPT = -2
+
+# Finales que añaden una fila "..." al trazo
+END_ROWS = {
+    'max_steps': "Terminated: Max steps reached",
+    'loop': "Terminated: Endless reductions without reading input",
+}
+
+
+class _Trace:
+    """ Step arrays and the sequence protocol shared by both traces. """
+
+    def __init__(self, grammar, tokens):
+        self.grammar = grammar
+        self.tokens = tokens  # entrada con el '$' final
+        self.node_parent = array('i', [-1])
+        self.step_top = array('i')  # nodo tope de la pila antes del paso
+        self.step_code = array('i')
+        self.step_cursor = array('i')
+        # None; 'max_steps' / 'loop' si la simulación se cortó (fila "..."
+        # extra, ver END_ROWS), 'goto_error' si la última reducción no tuvo
+        # GOTO (sólo LR)
+        self.end = None
+
+    def record(self, top, code, cursor):
+        self.step_top.append(top)
+        self.step_code.append(code)
+        self.step_cursor.append(cursor)
+
+    def input_text(self, i):
+        return " ".join(self.tokens[self.step_cursor[i]:])
+
+    def nbytes(self):
+        return sum(len(a) * a.itemsize for a in self._arrays())
+
+    def __len__(self):
+        return len(self.step_code) + (self.end in END_ROWS)
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("trace index out of range")
+        if i == len(self.step_code):
+            row = dict.fromkeys(self._keys, "...")
+            row['action'] = END_ROWS[self.end]
+            return row
+        return self.row(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class LRTrace(_Trace):
+    """
+    Trace of generator_lr.parse; step codes are parse_tables ACTION codes.
+    `conflicts` is the compiled table's map of conflicting cells: steps
+    taken on one of them name the actions the cell held.
+    """
+
+    _keys = ('stack', 'symbols', 'input', 'action')
+
+    def __init__(self, grammar, tokens, conflicts=None):
+        super().__init__(grammar, tokens)
+        self.conflicts = conflicts or {}
+        self.node_state = array('i', [0])
+        self.node_symbol = array('i', [-1])  # el fondo (estado 0) no tiene símbolo
+
+    def push(self, top, state, sym):
+        self.node_state.append(state)
+        self.node_symbol.append(sym)
+        self.node_parent.append(top)
+        return len(self.node_parent) - 1
+
+    def _path(self, node):
+        # Nodos de la pila desde el fondo hasta `node`
+        path = []
+        while node != -1:
+            path.append(node)
+            node = self.node_parent[node]
+        path.reverse()
+        return path
+
+    def stack_text(self, i):
+        return " ".join(str(self.node_state[n]) for n in self._path(self.step_top[i]))
+
+    def symbols_text(self, i):
+        symbols = self.grammar.symbols
+        return " ".join(symbols[self.node_symbol[n]] for n in self._path(self.step_top[i])[1:])
+
+    def action_text(self, i):
+        text = self._action_text(i)
+        if self.conflicts:
+            tok = parse_tables.token_id(self.grammar, self.tokens[self.step_cursor[i]])
+            cell = self.conflicts.get((self.node_state[self.step_top[i]], tok))
+            if cell:
+                # La tabla compilada eligió una de las acciones de la celda
+                text += f" (conflict: {'/'.join(sorted(cell))})"
+        return text
+
+    def _action_text(self, i):
+        g = self.grammar
+        code, top = self.step_code[i], self.step_top[i]
+        if code == parse_tables.ERROR:
+            tok = self.tokens[self.step_cursor[i]]
+            return f"Error: No action for input '{tok}' in state {self.node_state[top]}"
+        if code == parse_tables.ACCEPT:
+            return "Accept"
+        if code > 0:
+            return f"Shift {code - 1}"
+        prod_idx = -code - 1
+        production = g.production_str(prod_idx)
+        if self.end == 'goto_error' and i == len(self.step_code) - 1:
+            head, body = g.productions[prod_idx]
+            for _ in body:
+                top = self.node_parent[top]
+            return f"Reduce {prod_idx} ({production}), but GOTO error on [{self.node_state[top]}, {g.symbols[head]}]"
+        return f"Reduce {prod_idx}: {production}"
+
+    def row(self, i):
+        return {
+            'stack': self.stack_text(i),
+            'symbols': self.symbols_text(i),
+            'input': self.input_text(i),
+            'action': self.action_text(i)
+        }
+
+    def _arrays(self):
+        return (self.node_state, self.node_symbol, self.node_parent, self.step_top, self.step_code, self.step_cursor)
+
+
+class LLTrace(_Trace):
+    """
+    Trace of generator_ll.parse_input; a step code is the expanded
+    production, MATCH or ACCEPT. Node 0 is the '$' at the bottom.
+    """
+
+    _keys = ('stack', 'input', 'action')
+
+    def __init__(self, grammar, tokens):
+        super().__init__(grammar, tokens)
+        self.node_symbol = array('i', [grammar.eof])
+
+    def push(self, top, sym):
+        self.node_symbol.append(sym)
+        self.node_parent.append(top)
+        return len(self.node_parent) - 1
+
+    def stack_text(self, i):
+        # Tope primero, '$' a la derecha
+        symbols, names = self.grammar.symbols, []
+        node = self.step_top[i]
+        while node != -1:
+            names.append(symbols[self.node_symbol[node]])
+            node = self.node_parent[node]
+        return " ".join(names)
+
+    def action_text(self, i):
+        code = self.step_code[i]
+        if code == ACCEPT:
+            return "Accept"
+        if code == MATCH:
+            return f"Match {self.grammar.symbols[self.node_symbol[self.step_top[i]]]}"
+        return self.grammar.production_str(code)
+
+    def row(self, i):
+        return {
+            'stack': self.stack_text(i),
+            'input': self.input_text(i),
+            'action': self.action_text(i)
+        }
+
+    def _arrays(self):
+        return (self.node_symbol, self.node_parent, self.step_top, self.step_code, self.step_cursor)
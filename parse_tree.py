@@ -0,0 +1,130 @@
+"""
+Compact parse trees shared by the LL and LR drivers.
+
+A ParseTree keeps every node in three parallel int arrays (grammar symbol
+id, first child, next sibling), about 12 bytes per node instead of one
+Python object with its own children list. Traversals use an explicit
+stack, so deep trees do not hit the recursion limit; to_dict / to_nodes
+convert to the nested forms when a caller wants them.
+"""
+from array import array
+import firstandfollows
+
+LAMBDA = firstandfollows.LAMBDA
+EMPTY = -1  # símbolo de la hoja λ bajo una producción vacía
+
+
+class TreeNode:
+    def __init__(self, label, children=None):
+        self.label = label
+        self.children = children if children else []
+
+    def to_dict(self):
+        # Iterativo: un árbol profundo no agota la pila de Python
+        root = {"name": self.label, "children": []}
+        pending = [(self, root)]
+        while pending:
+            node, d = pending.pop()
+            for c in node.children:
+                child = {"name": c.label, "children": []}
+                d["children"].append(child)
+                pending.append((c, child))
+        return root
+
+    def __repr__(self):
+        return f"{self.label}"
+
+
+class ParseTree:
+    """
+    Nodes are indices; -1 means none. LL drivers add children when a
+    nonterminal is expanded (parents before children), LR drivers link the
+    popped nodes under a new one on each reduce (children before parents).
+    """
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.symbol = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.root = -1
+
+    def add(self, sym):
+        self.symbol.append(sym)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        return len(self.symbol) - 1
+
+    def add_children(self, parent, body):
+        """ Creates the nodes of `body` (a λ leaf if empty) under `parent`; returns the first. """
+        first = len(self.symbol)
+        for sym in body or (EMPTY,):
+            node = self.add(sym)
+            if node != first:
+                self.next_sibling[node - 1] = node
+        self.first_child[parent] = first
+        return first
+
+    def adopt(self, parent, children):
+        """ Links existing nodes `children` (a λ leaf if empty) under `parent`. """
+        if not children:
+            children = (self.add(EMPTY),)
+        self.first_child[parent] = children[0]
+        for a, b in zip(children, children[1:]):
+            self.next_sibling[a] = b
+        self.next_sibling[children[-1]] = -1
+
+    def label(self, node):
+        sym = self.symbol[node]
+        return LAMBDA if sym == EMPTY else self.grammar.symbols[sym]
+
+    def children(self, node):
+        child = self.first_child[node]
+        while child != -1:
+            yield child
+            child = self.next_sibling[child]
+
+    def preorder(self, node=None):
+        """ Yields (node, depth) in preorder, children left to right. """
+        if node is None:
+            node = self.root
+        pending = [(node, 0)]
+        while pending:
+            node, depth = pending.pop()
+            yield node, depth
+            pending.extend((c, depth + 1) for c in reversed(list(self.children(node))))
+
+    def leaves(self, node=None):
+        return [self.label(n) for n, _ in self.preorder(node) if self.first_child[n] == -1]
+
+    def _convert(self, node, make, attach):
+        # Recorrido iterativo que construye la forma anidada con make/attach
+        if node is None:
+            node = self.root
+        top = make(self.label(node))
+        pending = [(node, top)]
+        while pending:
+            node, out = pending.pop()
+            for c in self.children(node):
+                child = make(self.label(c))
+                attach(out, child)
+                pending.append((c, child))
+        return top
+
+    def to_dict(self, node=None):
+        """ Nested {'name', 'children'} dicts, like TreeNode.to_dict. """
+        return self._convert(node, lambda label: {"name": label, "children": []},
+                             lambda parent, child: parent["children"].append(child))
+
+    def to_nodes(self, node=None):
+        """ The same tree as linked TreeNode objects. """
+        return self._convert(node, TreeNode, lambda parent, child: parent.children.append(child))
+
+    def nbytes(self):
+        return sum(len(a) * a.itemsize for a in (self.symbol, self.first_child, self.next_sibling))
+
+    def __len__(self):
+        return len(self.symbol)
+
+    def __repr__(self):
+        return self.label(self.root) if self.root != -1 else "<empty>"
@@ -0,0 +1,104 @@
+"""
+Built parsers, reusable across inputs.
+
+build() runs one algorithm on a build context and returns a parser object
+holding its states, its generator table (for display and export) and the
+compiled table the drivers run on. Parsing more inputs with the same
+parser does no table work at all.
+"""
+from collections import OrderedDict
+import firstandfollows
+import generator_ll
+import generator_lr
+import generator_clr
+import generator_lalr
+import generator_pager
+import parse_tables
+
+# algoritmo -> (aumentar gramática, colección de estados, tabla)
+LR_ALGORITHMS = OrderedDict([
+    ("LR(0)", (generator_lr.augment_grammar, generator_lr.calc_states, generator_lr.make_table)),
+    ("SLR(1)", (generator_lr.augment_grammar, generator_lr.calc_states, generator_lr.make_table_slr)),
+    ("CLR(1)", (generator_clr.augment_grammar, generator_clr.calc_states, generator_clr.make_table)),
+    ("LALR(1)", (generator_clr.augment_grammar, generator_lalr.calc_states_lalr, generator_lalr.make_table_lalr)),
+    ("LR(1) (Pager)", (generator_clr.augment_grammar, generator_pager.calc_states_pager, generator_pager.make_table_pager)),
+])
+
+ALGORITHMS = ["LL(1)"] + list(LR_ALGORITHMS)
+
+
+class LLParser:
+    """
+    LL(1) parser: the PREDICT table compiled once, plus the start symbol
+    (by default the head of the first production, the one FOLLOW seeds
+    with '$' and the LR algorithms augment).
+    """
+
+    def __init__(self, ctx, table, start_symbol=None):
+        self.ctx = ctx
+        self.algorithm = "LL(1)"
+        self.states = None
+        self.table = table  # compute_ll1_table dict
+        self.compiled = parse_tables.compile_ll_table(ctx, table)
+        self.start_symbol = start_symbol or firstandfollows.get_grammar(ctx).head_name(0)
+
+    def parse(self, tokens):
+        """ generator_ll.parse_input: (tree or error string, trace). """
+        if isinstance(tokens, str):
+            tokens = tokens.split()
+        return generator_ll.parse_input(self.ctx, self.compiled, self.start_symbol, list(tokens))
+
+    def recognize(self, tokens, build_tree=False):
+        return generator_ll.recognize(self.ctx, self.compiled, self.start_symbol, tokens, build_tree)
+
+
+class LRParser:
+    """
+    LR parser of any flavour: the ACTION/GOTO table compiled once. With
+    `packed` the drivers run on its row-displacement form
+    (parse_tables.PackedLRTable), which also reduces by default: an error
+    may then be found after a few extra reductions, at the same token. On
+    an ambiguous grammar those reductions can cycle, and recognize reports
+    (None, position) where the plain table gives (False, position).
+    """
+
+    def __init__(self, ctx, table, algorithm=None, states=None, default_reductions=False, packed=False):
+        self.ctx = ctx
+        self.algorithm = algorithm
+        self.states = states
+        self.table = table  # make_table-style dict
+        self.compiled = parse_tables.compile_lr_table(ctx, table, default_reductions)
+        if packed:
+            self.compiled = parse_tables.pack_lr_table(self.compiled)
+        self.start_symbol = firstandfollows.get_grammar(ctx).head_name(0)  # el inicial aumentado
+
+    def parse(self, input_string, max_steps=1000):
+        """ generator_lr.parse: the step trace. """
+        if not isinstance(input_string, str):
+            input_string = " ".join(input_string)
+        return generator_lr.parse(self.ctx, self.compiled, input_string, max_steps)
+
+    def recognize(self, tokens, max_steps=None, build_tree=False):
+        return generator_lr.recognize(self.ctx, self.compiled, tokens, max_steps, build_tree)
+
+    def evaluate(self, tokens, on_reduce, on_shift=None, max_steps=None):
+        """ generator_lr.evaluate: (True, value), or (False/None, position). """
+        return generator_lr.evaluate(self.ctx, self.compiled, tokens, on_reduce, on_shift, max_steps)
+
+
+def build(ctx, algorithm, packed=False):
+    """
+    Builds the parser for `algorithm` (one of ALGORITHMS) on `ctx`, which
+    must have gone through compute_first_follow_bits. LR algorithms augment
+    the grammar of `ctx` first; `packed` selects the packed table for them
+    (see LRParser).
+    """
+    if algorithm == "LL(1)":
+        return LLParser(ctx, generator_ll.compute_ll1_table(ctx))
+    if algorithm not in LR_ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+
+    augment, calc_states, make_table = LR_ALGORITHMS[algorithm]
+    augment(ctx)
+    states = calc_states(ctx)
+    return LRParser(ctx, make_table(ctx, states), algorithm, states, packed=packed)
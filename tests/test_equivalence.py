@@ -0,0 +1,335 @@
+"""
+Equivalence checks between the fast engines and simple reference versions,
+plus regression cases for inputs the drivers used to get wrong.
+
+Grammars are (productions, terminals, nonterminals), as the GUI passes them
+to BuildContext.
+"""
+import random
+
+import pytest
+
+import firstandfollows
+import generator_clr
+import generator_lalr
+import parse_tables
+import parsers
+
+GRAMMARS = {
+    # Recursión izquierda (LL(1) con conflictos)
+    "expr": (["E→E + T", "E→T", "T→T * F", "T→F", "F→( E )", "F→id"],
+             ["+", "*", "(", ")", "id"], ["E", "T", "F"]),
+    # La misma sin recursión izquierda
+    "expr_ll": (["E→T E'", "E'→+ T E'", "E'→λ", "T→F T'", "T'→* F T'", "T'→λ", "F→( E )", "F→id"],
+                ["+", "*", "(", ")", "id", "λ"], ["E", "E'", "T", "T'", "F"]),
+    # Cadenas de anulables
+    "nullable": (["S→A B C d", "S→λ", "A→a", "A→λ", "B→A b", "B→C", "C→c", "C→λ"],
+                 ["a", "b", "c", "d", "λ"], ["S", "A", "B", "C"]),
+    # Derivaciones λ exponencialmente largas
+    "deep": (["S→A1 x"] + [f"A{i}→A{i + 1} A{i + 1}" for i in range(1, 10)] + ["A10→λ"],
+             ["x", "λ"], ["S"] + [f"A{i}" for i in range(1, 11)]),
+    # El inicial no es el primer no terminal declarado
+    "order": (["S→A b", "A→a B", "B→λ", "B→c"], ["a", "b", "c", "λ"], ["A", "S", "B"]),
+    # LR(1) pero no LALR(1): fusionar los estados de "c" crea un conflicto r/r
+    "lr1": (["S→a A d", "S→b B d", "S→a B e", "S→b A e", "A→c", "B→c"],
+            ["a", "b", "c", "d", "e"], ["S", "A", "B"]),
+    # Ambigua: S ⇒ C S ⇒ S sin leer nada
+    "cycle": (["S→C S", "C→λ", "S→x"], ["x", "λ"], ["S", "C"]),
+}
+
+
+def build_context(productions, terminals, nonterminals):
+    ctx = firstandfollows.BuildContext(productions, terminals, nonterminals)
+    firstandfollows.compile_grammar(ctx)
+    firstandfollows.compute_first_follow_bits(ctx)
+    return ctx
+
+
+def random_grammar(rng):
+    nts = [f"N{i}" for i in range(rng.randint(1, 6))]
+    ts = [f"t{i}" for i in range(rng.randint(1, 4))]
+    prods = []
+    for nt in nts:
+        for _ in range(rng.randint(1, 3)):
+            body = [rng.choice(nts + ts) for _ in range(rng.randint(0, 3))]
+            prods.append(f"{nt}→{' '.join(body) if body else 'λ'}")
+    return prods, ts, nts
+
+
+def all_grammars():
+    rng = random.Random(7)
+    return list(GRAMMARS.values()) + [random_grammar(rng) for _ in range(40)]
+
+
+# ------------------------------------------------------------------
+# FIRST/FOLLOW
+
+def reference_first_follow(g):
+    """ Textbook fixed point over sets of terminal ids: (first, nullable, follow). """
+    first = {nt: set() for nt in g.nonterminals}
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for head, body in g.productions:
+            before = (len(first[head]), head in nullable)
+            for sym in body:
+                if g.is_terminal(sym):
+                    first[head].add(sym)
+                    break
+                first[head] |= first[sym]
+                if sym not in nullable:
+                    break
+            else:
+                nullable.add(head)
+            changed |= before != (len(first[head]), head in nullable)
+
+    def first_of(seq):
+        out = set()
+        for sym in seq:
+            if g.is_terminal(sym):
+                return out | {sym}, False
+            out |= first[sym]
+            if sym not in nullable:
+                return out, False
+        return out, True
+
+    follow = {nt: set() for nt in g.nonterminals}
+    follow[g.start].add(g.eof)
+    changed = True
+    while changed:
+        changed = False
+        for head, body in g.productions:
+            for i, sym in enumerate(body):
+                if g.is_terminal(sym):
+                    continue
+                before = len(follow[sym])
+                rest, rest_nullable = first_of(body[i + 1:])
+                follow[sym] |= rest
+                if rest_nullable:
+                    follow[sym] |= follow[head]
+                changed |= len(follow[sym]) != before
+    return first, nullable, follow
+
+
+def bits(ids):
+    return sum(1 << i for i in ids)
+
+
+@pytest.mark.parametrize("grammar", all_grammars())
+def test_first_follow_bits_match_reference(grammar):
+    ctx = build_context(*grammar)
+    g = ctx.grammar
+    first, nullable, follow = reference_first_follow(g)
+    for nt in g.nonterminals:
+        assert g.first[nt] == bits(first[nt])
+        assert g.nullable[nt] == (nt in nullable)
+        assert g.follow[nt] == bits(follow[nt])
+
+        entry = ctx.nt_list[g.symbols[nt]]
+        lam = {firstandfollows.LAMBDA} if nt in nullable else set()
+        assert entry.primero == {g.symbols[t] for t in first[nt]} | lam
+        assert entry.siguiente == {g.symbols[t] for t in follow[nt]}
+
+
+def test_follow_is_seeded_on_the_head_of_the_first_production():
+    ctx = build_context(*GRAMMARS["order"])
+    assert ctx.nt_list["S"].siguiente == {"$"}
+    assert "$" not in ctx.nt_list["A"].siguiente
+
+
+# ------------------------------------------------------------------
+# Tablas LR compiladas
+
+def test_trace_names_the_resolved_conflict():
+    ctx = build_context(["E→E + E", "E→id"], ["+", "id"], ["E"])
+    parser = parsers.build(ctx, "SLR(1)")
+    assert parser.compiled.conflicts
+    actions = [row["action"] for row in parser.parse("id + id + id")]
+    assert actions[-1] == "Accept"
+    assert "Shift 3 (conflict: r1/s3)" in actions
+
+
+def lalr_by_core(ctx, calc_states):
+    """ LALR automaton keyed by LR(0) core: {core: (kernel lookaheads, transitions)}. """
+    generator_clr.augment_grammar(ctx)
+    states = calc_states(ctx)
+    core = {s.no: frozenset(item.core for item in s.kernel) for s in states}
+    return {core[s.no]: (sorted((item.core, item.lookahead) for item in s.kernel),
+                         {sym: core[target] for sym, target in s.transitions.items()})
+            for s in states}
+
+
+@pytest.mark.parametrize("grammar", all_grammars())
+def test_deremer_pennello_matches_merged_clr(grammar):
+    # Mismo autómata salvo la numeración de los estados
+    merged = lalr_by_core(build_context(*grammar), generator_lalr.calc_states_lalr_clr)
+    direct = lalr_by_core(build_context(*grammar), generator_lalr.calc_states_lalr)
+    assert direct == merged
+
+
+def sample_inputs(g, rng, count=12):
+    names = [g.symbols[t] for t in g.terminals if t != g.eof]
+    return [[rng.choice(names) for _ in range(rng.randint(0, 6))] if names else [] for _ in range(count)]
+
+
+@pytest.mark.parametrize("algorithm", list(parsers.LR_ALGORITHMS))
+@pytest.mark.parametrize("grammar", all_grammars())
+def test_packed_table_matches_dense(grammar, algorithm):
+    parser = parsers.build(build_context(*grammar), algorithm)
+    dense = parse_tables.compile_lr_table(parser.ctx, parser.table, default_reductions=True)
+    packed = parse_tables.pack_lr_table(dense)
+    plain = parser.compiled
+    g = plain.grammar
+    for state in range(plain.n_states):
+        for t in g.terminals:
+            assert packed.action_at(state, t) == dense.action_at(state, t)
+            if plain.action_at(state, t) != parse_tables.ERROR:
+                assert packed.action_at(state, t) == plain.action_at(state, t)
+        for nt in g.nonterminals:
+            if plain.goto_at(state, nt) != -1:
+                assert packed.goto_at(state, nt) == plain.goto_at(state, nt)
+
+    # Las reducciones por defecto no cambian el veredicto ni la posición del
+    # error; con conflictos (gramática ambigua) pueden ciclar donde la tabla
+    # sin ellas da error
+    packed_parser = parsers.build(build_context(*grammar), algorithm, packed=True)
+    assert isinstance(packed_parser.compiled, parse_tables.PackedLRTable)
+    for tokens in sample_inputs(g, random.Random(algorithm)):
+        got, want = packed_parser.recognize(tokens), parser.recognize(tokens)
+        if plain.conflicts:
+            assert got[1] == want[1] and (got[0] is True) == (want[0] is True)
+        else:
+            assert got == want
+
+
+@pytest.mark.parametrize("grammar", all_grammars())
+def test_pager_has_the_conflicts_of_clr(grammar):
+    clr = parsers.build(build_context(*grammar), "CLR(1)")
+    pager = parsers.build(build_context(*grammar), "LR(1) (Pager)")
+    lalr = parsers.build(build_context(*grammar), "LALR(1)")
+    assert len(lalr.states) <= len(pager.states) <= len(clr.states)
+    assert bool(lalr.compiled.conflicts) >= bool(clr.compiled.conflicts)
+    # Pager sólo fusiona lo que no crea conflictos nuevos
+    assert bool(pager.compiled.conflicts) == bool(clr.compiled.conflicts)
+    if not clr.compiled.conflicts:
+        inputs = sample_inputs(clr.compiled.grammar, random.Random(2)) + [["b", "c", "e"], ["b", "c", "d"]]
+        for tokens in inputs:
+            assert pager.recognize(tokens) == clr.recognize(tokens)
+
+
+# ------------------------------------------------------------------
+# Conductores LR: guarda de bucles
+
+def reference_recognize(table, tokens, budget=100000):
+    """ The LR loop without LoopGuard: a run of `budget` reductions without a shift counts as endless. """
+    g = table.grammar
+    syms = [parse_tables.token_id(g, tok) for tok in tokens] + [g.eof]
+    stack, cursor, run = [0], 0, 0
+    while True:
+        code = table.action_at(stack[-1], syms[cursor]) if syms[cursor] != -1 else parse_tables.ERROR
+        if code > 0:
+            stack.append(code - 1)
+            cursor, run = cursor + 1, 0
+        elif code == parse_tables.ACCEPT:
+            return True, None
+        elif code == parse_tables.ERROR:
+            return False, cursor
+        else:
+            run += 1
+            if run > budget:
+                return None, cursor
+            head, body = table.grammar.productions[-code - 1]
+            if body:
+                del stack[-len(body):]
+            target = table.goto_at(stack[-1], head)
+            if target == -1:
+                return False, cursor
+            stack.append(target)
+
+
+@pytest.mark.parametrize("algorithm", list(parsers.LR_ALGORITHMS))
+@pytest.mark.parametrize("grammar", all_grammars())
+def test_loop_guard_is_exact(grammar, algorithm):
+    # Sólo corta lo que de verdad no termina, y siempre lo corta
+    parser = parsers.build(build_context(*grammar), algorithm)
+    for tokens in sample_inputs(parser.compiled.grammar, random.Random(3)):
+        assert parser.recognize(tokens) == reference_recognize(parser.compiled, tokens)
+
+
+@pytest.mark.parametrize("algorithm", list(parsers.LR_ALGORITHMS))
+def test_lr_accepts_long_lambda_derivations(algorithm):
+    # 2^9 reducciones de A10→λ antes de desplazar x
+    parser = parsers.build(build_context(*GRAMMARS["deep"]), algorithm)
+    assert parser.recognize("x") == (True, None)
+    assert len(parser.recognize("x", build_tree=True)[0].leaves()) == 2 ** 9 + 1
+    # Nodos interiores: S y los 2^10 - 1 de A1..A10
+    assert parser.evaluate("x", lambda prod, values: sum(values, 1), lambda tok: 0) == (True, 2 ** 10)
+    assert parser.parse("x", None)[-1]["action"] == "Accept"
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_uncapped_trace_stops_on_endless_reductions(packed):
+    # LR(0) reduce C→λ en todo estado con C: sin tope, parse no volvía
+    parser = parsers.build(build_context(*GRAMMARS["cycle"]), "LR(0)", packed=packed)
+    trace = parser.parse("", None)
+    assert trace.end == "loop"
+    assert trace[-1]["action"] == "Terminated: Endless reductions without reading input"
+    assert parser.recognize("") == (None, 0)
+    assert generator_clr.parse(parser.ctx, parser.compiled, "", None).end == "loop"
+    assert parser.parse("x", None)[-1]["action"] == "Accept"
+
+
+def test_uncapped_trace_ends_on_a_cyclic_grammar():
+    # S→S: la celda [1, $] tiene Aceptar/r2 y la tabla compilada acepta
+    parser = parsers.build(build_context(["S→λ", "S→S"], ["λ"], ["S"]), "LR(0)")
+    assert parser.parse("", None)[-1]["action"].startswith("Accept")
+    assert parser.recognize("") == (True, None)
+
+
+# ------------------------------------------------------------------
+# Conductores LL(1)
+
+@pytest.mark.parametrize("grammar", all_grammars())
+def test_ll_parse_input_and_recognize_agree(grammar):
+    parser = parsers.build(build_context(*grammar), "LL(1)")
+    g = parser.compiled.grammar
+    # También tokens con el nombre de un no terminal: no son terminales
+    inputs = sample_inputs(g, random.Random(1)) + [[g.symbols[nt]] for nt in g.nonterminals]
+    for tokens in inputs:
+        result, trace = parser.parse(tokens)
+        accepted, position = parser.recognize(tokens)
+        if isinstance(result, str):
+            assert accepted is (None if result.startswith("Error: Endless expansion") else False)
+        else:
+            assert (accepted, position) == (True, None)
+            assert parser.recognize(tokens, build_tree=True)[0].to_dict() == result.to_dict()
+            assert trace[-1]["action"] == "Accept"
+
+
+def test_ll_starts_from_the_head_of_the_first_production():
+    parser = parsers.build(build_context(*GRAMMARS["order"]), "LL(1)")
+    assert parser.start_symbol == "S"
+    assert parser.recognize("a b") == (True, None)
+    assert parser.recognize("a c b") == (True, None)
+    assert not isinstance(parser.parse(["a", "b"])[0], str)
+
+
+def test_ll_token_named_like_a_nonterminal_is_rejected():
+    parser = parsers.build(build_context(*GRAMMARS["order"]), "LL(1)")
+    assert isinstance(parser.parse(["S"])[0], str)
+    assert parser.recognize(["S"]) == (False, 0)
+
+
+def test_ll_accepts_long_lambda_derivations():
+    parser = parsers.build(build_context(*GRAMMARS["deep"]), "LL(1)")
+    assert parser.recognize("x") == (True, None)
+    assert parser.recognize("x", build_tree=True)[0] is not None
+    assert not isinstance(parser.parse(["x"])[0], str)
+
+
+def test_ll_stops_on_left_recursion():
+    # M[S, b] queda con S→S a (la última producción gana el conflicto)
+    parser = parsers.build(build_context(["S→b", "S→S a"], ["a", "b"], ["S"]), "LL(1)")
+    assert parser.recognize("b a") == (None, 0)
+    assert parser.parse(["b", "a"])[0].startswith("Error: Endless expansion of S")